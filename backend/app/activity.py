@@ -0,0 +1,165 @@
+"""
+Incrementally maintained dashboard aggregates and the per-user activity feed.
+
+Lifecycle handlers take a `snapshot` of a contract before changing it and call
+`track_contract_change` afterwards, in the same transaction. The difference
+between the two snapshots is applied to both parties' `UserContractStats` row
+as in-SQL increments, so dashboards never have to scan the contracts table.
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+
+from app import models
+
+# Statuses in which a party that has not approved yet still has to act
+ACTIVE_STATUSES = (
+    models.ContractStatus.PENDING,
+    models.ContractStatus.EDITED,
+    models.ContractStatus.APPROVED,
+)
+
+
+class ContractSnapshot(NamedTuple):
+    status: models.ContractStatus
+    sender_id: int
+    recipient_id: int
+    sender_approved: int
+    recipient_approved: int
+
+
+def snapshot(contract: models.Contract) -> ContractSnapshot:
+    return ContractSnapshot(
+        models.ContractStatus(contract.status),
+        contract.sender_id,
+        contract.recipient_id,
+        contract.sender_approved,
+        contract.recipient_approved,
+    )
+
+
+def contributions(state: ContractSnapshot) -> Dict[int, Counter]:
+    """What one contract adds to each party's aggregates."""
+    result = {}
+    for user_id, approved in (
+        (state.sender_id, state.sender_approved),
+        (state.recipient_id, state.recipient_approved),
+    ):
+        counts = Counter({"total": 1, state.status.value: 1})
+        if state.status in ACTIVE_STATUSES and not approved:
+            counts["awaiting_my_approval"] = 1
+        result[user_id] = counts
+    return result
+
+
+def apply_stats_delta(db: Session, before: Optional[ContractSnapshot], after: ContractSnapshot) -> None:
+    old = contributions(before) if before else {}
+    new = contributions(after)
+    now = datetime.utcnow()
+    for user_id in set(old) | set(new):
+        delta = Counter(new.get(user_id, {}))
+        delta.subtract(old.get(user_id, {}))
+        values = {
+            getattr(models.UserContractStats, column): getattr(models.UserContractStats, column) + amount
+            for column, amount in delta.items() if amount
+        }
+        values[models.UserContractStats.last_activity_at] = now
+        # Users without a row yet get one built from scratch on their first read
+        db.query(models.UserContractStats).filter(
+            models.UserContractStats.user_id == user_id
+        ).update(values, synchronize_session=False)
+
+
+def record_activity(db: Session, contract: models.Contract, actor_id: int, event_type: str) -> None:
+    for user_id in (contract.sender_id, contract.recipient_id):
+        db.add(models.ContractActivity(
+            user_id=user_id,
+            contract_id=contract.id,
+            actor_id=actor_id,
+            type=event_type
+        ))
+
+
+def track_contract_change(
+    db: Session,
+    before: Optional[ContractSnapshot],
+    contract: models.Contract,
+    actor_id: int,
+    event_type: str,
+) -> None:
+    """Update both parties' aggregates and activity feeds for a contract transition."""
+    apply_stats_delta(db, before, snapshot(contract))
+    record_activity(db, contract, actor_id, event_type)
+
+
+def rebuild_user_stats(db: Session, user_id: int) -> models.UserContractStats:
+    """Compute a user's aggregates from the contracts table (first read, or repair)."""
+    # Create the row before counting: transitions that commit from then on
+    # update it, and ones that committed earlier are in the recount below
+    if db.get(models.UserContractStats, user_id) is None:
+        db.add(models.UserContractStats(user_id=user_id))
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent first read inserted the row already
+            db.rollback()
+
+    mine = or_(models.Contract.sender_id == user_id, models.Contract.recipient_id == user_id)
+    my_approval_pending = or_(
+        and_(models.Contract.sender_id == user_id, models.Contract.sender_approved == 0),
+        and_(models.Contract.recipient_id == user_id, models.Contract.recipient_approved == 0),
+    )
+
+    def count(*criteria):
+        return select(func.count(models.Contract.id)).where(mine, *criteria).scalar_subquery()
+
+    # One statement, so the counts are read and written atomically and no
+    # concurrent delta can land between the two
+    values = {status.value: count(models.Contract.status == status) for status in models.ContractStatus}
+    db.execute(update(models.UserContractStats).where(
+        models.UserContractStats.user_id == user_id
+    ).values(
+        total=count(),
+        awaiting_my_approval=count(models.Contract.status.in_(ACTIVE_STATUSES), my_approval_pending),
+        last_activity_at=select(func.max(models.ContractActivity.created_at)).where(
+            models.ContractActivity.user_id == user_id
+        ).scalar_subquery(),
+        **values
+    ))
+    db.commit()
+    stats = db.get(models.UserContractStats, user_id)
+    db.refresh(stats)
+    return stats
+
+
+def get_user_stats(db: Session, user_id: int) -> models.UserContractStats:
+    return db.get(models.UserContractStats, user_id) or rebuild_user_stats(db, user_id)
+
+
+def activity_feed(db: Session, user_id: int, limit: int = 20, before_id: Optional[int] = None) -> List[dict]:
+    """Newest-first activity for a user, paged by id via the (user_id, id) index."""
+    query = db.query(models.ContractActivity).options(
+        joinedload(models.ContractActivity.contract),
+        joinedload(models.ContractActivity.actor)
+    ).filter(models.ContractActivity.user_id == user_id)
+    if before_id is not None:
+        query = query.filter(models.ContractActivity.id < before_id)
+    events = query.order_by(models.ContractActivity.id.desc()).limit(limit).all()
+    return [
+        {
+            "id": event.id,
+            "contract_id": event.contract_id,
+            "contract_title": event.contract.title,
+            "contract_status": event.contract.status,
+            "actor_id": event.actor_id,
+            "actor_username": event.actor.username,
+            "type": event.type,
+            "created_at": event.created_at,
+        }
+        for event in events
+    ]
@@ -0,0 +1,70 @@
+import logging
+import os
+import socket
+import threading
+from typing import Callable, List
+
+from app.shared_state import get_shared_state
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Run `func` every `interval` seconds in a daemon thread.
+
+    Each run first takes the shared-state lock `task:<name>` with a TTL of one
+    interval, so with several workers only one of them runs the task per interval.
+    The lock is renewed while `func` runs, so a run longer than the interval
+    does not let another worker start the task alongside it.
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], None]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"task-{name}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _take_lock(self) -> bool:
+        return get_shared_state().acquire_lock(f"task:{self.name}", self.owner, ttl=self.interval)
+
+    def _renew_lock(self, done: threading.Event) -> None:
+        while not done.wait(self.interval / 3):
+            try:
+                self._take_lock()
+            except Exception:
+                logger.exception("Could not renew the lock for background task %s", self.name)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not self._take_lock():
+                continue
+            done = threading.Event()
+            renewer = threading.Thread(target=self._renew_lock, args=(done,), name=f"task-{self.name}-lock", daemon=True)
+            renewer.start()
+            try:
+                self.func()
+            except Exception:
+                logger.exception("Background task %s failed", self.name)
+            finally:
+                done.set()
+                renewer.join()
+
+
+def start_tasks(tasks: List[PeriodicTask]) -> List[PeriodicTask]:
+    started = [task for task in tasks if task.interval > 0]
+    for task in started:
+        task.start()
+    return started
+
+
+def stop_tasks(tasks: List[PeriodicTask]) -> None:
+    for task in tasks:
+        task.stop()
@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import orjson
+
+from app.shared_state import SharedState, get_shared_state
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A serialized contract detail response and the data needed to authorize it."""
+    etag: str
+    body: bytes
+    sender_id: int
+    recipient_id: int
+
+    def dumps(self) -> bytes:
+        header = orjson.dumps([self.etag, self.sender_id, self.recipient_id])
+        return header + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedResponse":
+        header, _, body = data.partition(b"\n")
+        etag, sender_id, recipient_id = orjson.loads(header)
+        return cls(etag=etag, body=body, sender_id=sender_id, recipient_id=recipient_id)
+
+
+def make_etag(contract_id: int, row_version: int) -> str:
+    """Build a strong ETag from a contract's version token."""
+    return f'"{contract_id}-{row_version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ContractResponseCache:
+    """Cache of serialized `ContractResponse` bodies keyed by contract id.
+
+    Entries live in the shared-state backend, so every worker sees the same
+    entries and invalidations. They are dropped by the contract transition
+    handlers, and readers check a hit's ETag against the row's `row_version`,
+    so a hit is the latest committed state and is served without the ORM. Every invalidation bumps a shared generation
+    counter; callers read it before loading from the database and pass it to
+    `put`, so a render that raced with a write is never kept.
+    """
+
+    GENERATION_KEY = "contract-cache:generation"
+
+    def __init__(self, state: Optional[SharedState] = None, ttl: float = 3600):
+        self._state = state
+        self.ttl = ttl
+
+    @property
+    def state(self) -> SharedState:
+        return self._state or get_shared_state()
+
+    @staticmethod
+    def key(contract_id: int) -> str:
+        return f"contract-cache:{contract_id}"
+
+    @property
+    def generation(self) -> int:
+        return self.state.counter(self.GENERATION_KEY)
+
+    def get(self, contract_id: int) -> Optional[CachedResponse]:
+        data = self.state.get(self.key(contract_id))
+        return CachedResponse.loads(data) if data is not None else None
+
+    def put(self, contract_id: int, entry: CachedResponse, generation: int) -> None:
+        state = self.state
+        if state.counter(self.GENERATION_KEY) != generation:
+            return
+        state.set(self.key(contract_id), entry.dumps(), ttl=self.ttl)
+        # Another worker may have invalidated between the check and the write
+        if state.counter(self.GENERATION_KEY) != generation:
+            state.delete(self.key(contract_id))
+
+    def clear(self) -> None:
+        """Drop every entry, e.g. on startup: a persistent backend may still hold
+        entries rendered from a different (since reset or replaced) database."""
+        state = self.state
+        state.incr(self.GENERATION_KEY)
+        state.delete_prefix(self.key(""))
+
+    def invalidate(self, *contract_ids: int) -> None:
+        state = self.state
+        state.incr(self.GENERATION_KEY)
+        state.delete(*(self.key(contract_id) for contract_id in contract_ids))
+
+
+contract_cache = ContractResponseCache()
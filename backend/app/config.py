@@ -0,0 +1,78 @@
+from functools import lru_cache
+from typing import List, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Application settings, read once from the environment and `.env`."""
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    database_url: str = "sqlite:///./contracts.db"
+
+    secret_key: str = "your-secret-key-change-this-in-production"
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+
+    upload_dir: str = "uploads"
+    cold_storage_url: str = "archive://./cold_storage"
+    s3_endpoint_url: Optional[str] = None
+    # Versions of signed/denied contracts, and versions not read for this many
+    # days, move to the cold tier; the mover runs every interval (0 disables it)
+    cold_after_days: int = 30
+    tiering_interval_seconds: int = 3600
+    tiering_batch_size: int = 100
+    compress_uploads: bool = True
+    upload_compression_level: int = 6
+    # Background integrity check / orphan GC (see app/integrity.py; 0 disables it)
+    integrity_interval_seconds: int = 86400
+    integrity_batch_size: int = 200
+    integrity_batch_pause: float = 0.05
+    # Re-reading every blob (the whole bucket on s3) is for `--verify` runs, not the daily pass
+    integrity_verify_checksums: bool = False
+    orphan_grace_seconds: int = 3600
+    gc_reclaim: bool = False
+    # Reminders, lock expiry and deadlines (see app/scheduler.py; 0 disables each)
+    scheduler_interval_seconds: int = 60
+    scheduler_batch_size: int = 100
+    reminder_after_days: int = 3
+    lock_timeout_minutes: int = 60
+    contract_deadline_days: int = 0  # default deadline for new contracts
+    cors_origins: List[str] = ["http://localhost:3000"]  # Next.js default port
+
+    # "migrate" creates missing tables/columns/indexes on startup, "check" only
+    # verifies the schema and refuses to start on drift, "off" skips both
+    schema_mode: str = "migrate"
+
+    # Token buckets per user and route (see app/rate_limit.py); the concurrency
+    # cap and polling shed threshold apply per worker
+    rate_limiting: bool = True
+    upload_rate_per_minute: float = 20
+    upload_burst: int = 5
+    write_rate_per_minute: float = 120
+    write_burst: int = 30
+    # The Navbar polls every 2 s per tab and again on each route change
+    poll_rate_per_minute: float = 300
+    poll_burst: int = 30
+    upload_concurrency: int = 4
+    shed_polling_above: int = 64
+
+    fast_serialization: bool = True
+    compression_minimum_size: int = 1024
+    shared_state_url: str = "memory://"
+
+    # Read-only routes go to these (round-robin); a user's reads stay on the
+    # primary for this long after their own write. See app/replicas.py
+    replica_urls: List[str] = []
+    read_your_writes_seconds: float = 5
+    # Copy the primary into SQLite replica files this often (a development
+    # stand-in for real replication; 0 disables it)
+    replica_sync_interval_seconds: int = 0
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
@@ -1,15 +1,18 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
-import os
-from dotenv import load_dotenv
+from app.config import settings
 
-load_dotenv()
+DATABASE_URL = settings.database_url
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./contracts.db")
+def make_engine(url: str):
+    return create_engine(url, connect_args={"check_same_thread": False} if "sqlite" in url else {})
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replicas for read-only routes (see app/replicas.py)
+replica_engines = [make_engine(url) for url in settings.replica_urls]
+
 Base = declarative_base()
 
 def get_db():
@@ -18,4 +21,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
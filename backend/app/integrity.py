@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Integrity check and orphan-file garbage collector for contract storage.
+
+Walks every storage tier and the `contract_versions` table in bounded batches,
+each with its own short-lived session and a pause in between, so it can run
+next to the live server. It reports:
+
+- orphans:    stored blobs no version references (older than the grace period)
+- dangling:   versions whose blob is missing from every tier
+- misplaced:  versions whose blob is in a different tier than recorded
+- corrupted:  versions whose stored bytes no longer match their checksum
+
+The app runs it every `INTEGRITY_INTERVAL_SECONDS`; by hand:
+
+    python -m app.integrity [--verify] [--reclaim] [--batch-size 200]
+"""
+
+import argparse
+import logging
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Set
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.storage import StorageBackend, checksum_of, get_tiers, storage_key
+
+logger = logging.getLogger(__name__)
+
+# Versions created before file_path held bare keys store "uploads/<key>"
+LEGACY_PREFIX = "uploads/"
+
+
+@dataclass
+class IntegrityReport:
+    files_scanned: int = 0
+    versions_scanned: int = 0
+    orphans: List[str] = field(default_factory=list)
+    orphan_bytes: int = 0
+    dangling: List[int] = field(default_factory=list)
+    misplaced: List[int] = field(default_factory=list)
+    corrupted: List[int] = field(default_factory=list)
+    unverified: int = 0
+    reclaimed: int = 0
+    reclaimed_bytes: int = 0
+
+    @property
+    def healthy(self) -> bool:
+        return not (self.orphans or self.dangling or self.misplaced or self.corrupted)
+
+    def summary(self) -> str:
+        return (
+            f"{self.files_scanned} files and {self.versions_scanned} versions scanned: "
+            f"{len(self.orphans)} orphans ({self.orphan_bytes} bytes), "
+            f"{len(self.dangling)} dangling, {len(self.misplaced)} misplaced, "
+            f"{len(self.corrupted)} corrupted, {self.unverified} without checksum, "
+            f"{self.reclaimed} reclaimed ({self.reclaimed_bytes} bytes)"
+        )
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def referencing_tiers(keys: List[str]) -> Dict[str, Set[str]]:
+    """Map each of `keys` that some version points at to the tiers those versions record."""
+    candidates = keys + [LEGACY_PREFIX + key for key in keys]
+    db = SessionLocal()
+    try:
+        rows = db.query(models.ContractVersion.file_path, models.ContractVersion.storage_tier).filter(
+            models.ContractVersion.file_path.in_(candidates)
+        ).all()
+    finally:
+        db.close()
+    tiers: Dict[str, Set[str]] = {}
+    for file_path, tier in rows:
+        tiers.setdefault(storage_key(file_path), set()).add(tier)
+    return tiers
+
+
+def is_orphan(key: str, tier: str, recorded_tiers: Set[str], tiers: Dict[str, StorageBackend]) -> bool:
+    """A blob is garbage if nothing references it, or if it is a leftover copy
+    (e.g. from an interrupted tier move) and the recorded tier holds the blob.
+    A blob that is only in the wrong tier is misplaced, never garbage."""
+    if not recorded_tiers:
+        return True
+    if tier in recorded_tiers:
+        return False
+    return all(name in tiers and tiers[name].exists(key) for name in recorded_tiers)
+
+
+def scan_orphans(report: IntegrityReport, batch_size: int, pause: float, grace: float, reclaim: bool) -> None:
+    # Uploads write the blob before committing the row, and tiering writes the
+    # cold copy before flipping the tier, so recent blobs are never orphans
+    cutoff = time.time() - grace
+    tiers = get_tiers()
+    for tier, backend in tiers.items():
+        for batch in batched(backend.iter_keys(), batch_size):
+            report.files_scanned += len(batch)
+            settled = [item for item in batch if item.modified < cutoff]
+            references = referencing_tiers([item.key for item in settled]) if settled else {}
+            for item in settled:
+                if not is_orphan(item.key, tier, references.get(item.key, set()), tiers):
+                    continue
+                report.orphans.append(f"{tier}:{item.key}")
+                report.orphan_bytes += item.size
+                if reclaim:
+                    backend.delete(item.key)
+                    report.reclaimed += 1
+                    report.reclaimed_bytes += item.size
+            time.sleep(pause)
+
+
+def scan_versions(report: IntegrityReport, batch_size: int, pause: float, verify: bool) -> None:
+    tiers = get_tiers()
+    after_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            batch = db.query(
+                models.ContractVersion.id,
+                models.ContractVersion.file_path,
+                models.ContractVersion.storage_tier,
+                models.ContractVersion.checksum
+            ).filter(
+                models.ContractVersion.id > after_id
+            ).order_by(models.ContractVersion.id).limit(batch_size).all()
+        finally:
+            db.close()
+        if not batch:
+            return
+
+        for version_id, file_path, tier, checksum in batch:
+            after_id = version_id
+            report.versions_scanned += 1
+            key = storage_key(file_path)
+            backend = tiers.get(tier)
+            if backend is None or not backend.exists(key):
+                if any(other.exists(key) for name, other in tiers.items() if name != tier):
+                    report.misplaced.append(version_id)
+                else:
+                    report.dangling.append(version_id)
+                continue
+            if checksum is None:
+                report.unverified += 1
+            elif verify and checksum_of(backend.iter_chunks(key)) != checksum:
+                report.corrupted.append(version_id)
+        time.sleep(pause)
+
+
+def run_integrity_check(
+    verify: bool = None,
+    reclaim: bool = None,
+    batch_size: int = None,
+    pause: float = None,
+    grace: float = None,
+) -> IntegrityReport:
+    report = IntegrityReport()
+    batch_size = batch_size or settings.integrity_batch_size
+    pause = settings.integrity_batch_pause if pause is None else pause
+    grace = settings.orphan_grace_seconds if grace is None else grace
+    verify = settings.integrity_verify_checksums if verify is None else verify
+    reclaim = settings.gc_reclaim if reclaim is None else reclaim
+
+    scan_versions(report, batch_size, pause, verify)
+    scan_orphans(report, batch_size, pause, grace, reclaim)
+    if report.healthy:
+        logger.info("Storage integrity check: %s", report.summary())
+    else:
+        logger.warning("Storage integrity check: %s", report.summary())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verify", action="store_true", help="re-hash stored blobs against their checksums")
+    parser.add_argument("--reclaim", action="store_true", help="delete orphaned blobs")
+    parser.add_argument("--batch-size", type=int, default=settings.integrity_batch_size)
+    parser.add_argument("--grace", type=float, default=settings.orphan_grace_seconds,
+                        help="ignore blobs modified less than this many seconds ago")
+    args = parser.parse_args()
+
+    report = run_integrity_check(
+        verify=args.verify, reclaim=args.reclaim, batch_size=args.batch_size, pause=0, grace=args.grace
+    )
+    print(f"Scanned {report.files_scanned} stored files and {report.versions_scanned} versions.")
+    for label, items in (
+        ("Orphaned files", report.orphans),
+        ("Versions with missing files (dangling)", report.dangling),
+        ("Versions stored in the wrong tier (misplaced)", report.misplaced),
+        ("Versions failing checksum verification", report.corrupted),
+    ):
+        mark = "✓" if not items else "✗"
+        print(f"{mark} {label}: {len(items)}")
+        for item in items[:20]:
+            print(f"    {item}")
+        if len(items) > 20:
+            print(f"    ... and {len(items) - 20} more")
+    if report.unverified:
+        print(f"  {report.unverified} version(s) predate checksums and were not verified.")
+    if report.orphans and not args.reclaim:
+        print(f"  Run with --reclaim to free {report.orphan_bytes} bytes held by orphaned files.")
+    if report.reclaimed:
+        print(f"✓ Reclaimed {report.reclaimed} file(s), {report.reclaimed_bytes} bytes.")
+
+
+if __name__ == "__main__":
+    main()
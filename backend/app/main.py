@@ -1,22 +1,58 @@
+from contextlib import asynccontextmanager
+from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from app.background import PeriodicTask, start_tasks, stop_tasks
+from app.cache import contract_cache
+from app.compression import CompressionMiddleware
+from app.config import settings
+from app.integrity import run_integrity_check
+from app.migrate import prepare_database
+from app.scheduler import run_due_jobs
+from app.rate_limit import RateLimitMiddleware
+from app.replicas import sync_sqlite_replicas
+from app.tiering import run_tiering
 from app.routers import auth, contracts, users, notifications
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema work and filesystem setup run once per worker here, not on import
+    prepare_database(settings.schema_mode)
+    Path(settings.upload_dir).mkdir(exist_ok=True)
+    # Cached bodies are keyed by contract id only; never serve ones from an earlier database
+    contract_cache.clear()
+    tasks = start_tasks([
+        PeriodicTask("storage-tiering", settings.tiering_interval_seconds, run_tiering),
+        PeriodicTask("storage-integrity", settings.integrity_interval_seconds, run_integrity_check),
+        PeriodicTask("contract-scheduler", settings.scheduler_interval_seconds, run_due_jobs),
+        PeriodicTask("replica-sync", settings.replica_sync_interval_seconds, sync_sqlite_replicas),
+    ])
+    yield
+    stop_tasks(tasks)
 
-app = FastAPI(title="Digital Contracts API", version="1.0.0")
+app = FastAPI(title="Digital Contracts API", version="1.0.0", lifespan=lifespan)
+
+# Rate limiting sits inside CORS so browsers can read 429/503 responses
+if settings.rate_limiting:
+    app.add_middleware(
+        RateLimitMiddleware,
+        upload_concurrency=settings.upload_concurrency,
+        shed_polling_above=settings.shed_polling_above,
+    )
 
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000"],  # Next.js default port
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# Compress JSON/NDJSON responses (brotli when available, else gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(contracts.router, prefix="/api/contracts", tags=["contracts"])
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Explicit schema migrate/check step.
+
+Runs on startup according to `SCHEMA_MODE` (see `app.config`), or by hand:
+
+    python -m app.migrate           # create missing tables, columns and indexes
+    python -m app.migrate --check   # report drift and exit non-zero if any
+"""
+
+import argparse
+import sys
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app import models  # noqa: F401 - registers the tables on Base.metadata
+from app.database import Base, engine
+
+
+def schema_drift(bind: Engine) -> List[str]:
+    """List tables, columns and indexes defined in the models but missing from the database."""
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    problems = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            problems.append(f"missing table {table.name}")
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                problems.append(f"missing column {table.name}.{column.name}")
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                problems.append(f"missing index {index.name}")
+    return problems
+
+
+def add_column_sql(bind: Engine, table, column) -> str:
+    column_type = column.type.compile(dialect=bind.dialect)
+    sql = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        sql += f" DEFAULT {default!r}"
+    if not column.nullable:
+        if default is None:
+            raise RuntimeError(
+                f"Cannot add NOT NULL column {table.name}.{column.name} without a default; "
+                "reset the database (see reset_db.py)"
+            )
+        sql += " NOT NULL"
+    return sql
+
+
+def migrate(bind: Engine = engine) -> List[str]:
+    """Create missing tables, add missing columns and indexes. Returns what was applied."""
+    applied = []
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    Base.metadata.create_all(bind=bind)
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            applied.append(f"created table {table.name}")
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        with bind.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    conn.execute(text(add_column_sql(bind, table, column)))
+                    applied.append(f"added column {table.name}.{column.name}")
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=conn)
+                    applied.append(f"created index {index.name}")
+    return applied
+
+
+def check(bind: Engine = engine) -> None:
+    """Raise if the database does not match the models."""
+    problems = schema_drift(bind)
+    if problems:
+        raise RuntimeError(
+            "Database schema is out of date (" + "; ".join(problems) + "). Run `python -m app.migrate`."
+        )
+
+
+def prepare_database(mode: str, bind: Engine = engine) -> None:
+    if mode == "migrate":
+        migrate(bind)
+    elif mode == "check":
+        check(bind)
+    elif mode != "off":
+        raise ValueError(f"Unknown SCHEMA_MODE: {mode}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only report schema drift")
+    args = parser.parse_args()
+
+    if args.check:
+        problems = schema_drift(engine)
+        for problem in problems:
+            print(f"✗ {problem}")
+        if problems:
+            sys.exit(1)
+        print("✓ Database schema is up to date.")
+        return
+
+    applied = migrate(engine)
+    for change in applied:
+        print(f"✓ {change}")
+    if not applied:
+        print("✓ Database schema is up to date. Nothing to do.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text, Index
+from sqlalchemy import event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -49,6 +50,12 @@ class Contract(Base):
     sender_approved = Column(Integer, default=0, nullable=False)  # 0 = not approved, 1 = approved
     recipient_approved = Column(Integer, default=0, nullable=False)  # 0 = not approved, 1 = approved
     
+    # Contracts still open after this are denied automatically (see app/scheduler.py)
+    deadline = Column(DateTime(timezone=True), nullable=True)
+    
+    # Version token - bumped on every UPDATE, used for ETags and response caching
+    row_version = Column(Integer, default=1, nullable=False)
+    
     # Relationships
     sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_contracts")
     recipient = relationship("User", foreign_keys=[recipient_id], back_populates="received_contracts")
@@ -56,18 +63,34 @@ class Contract(Base):
     versions = relationship("ContractVersion", back_populates="contract", cascade="all, delete-orphan", order_by="ContractVersion.version_number.desc()")
 
 
+@event.listens_for(Contract, "before_update")
+def bump_row_version(mapper, connection, target):
+    # Increment in SQL so concurrent writers never produce the same token
+    target.row_version = Contract.row_version + 1
+
+
 class ContractVersion(Base):
     __tablename__ = "contract_versions"
     
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False, index=True)
     version_number = Column(Integer, nullable=False)
-    file_path = Column(String, nullable=False)
+    file_path = Column(String, nullable=False, index=True)
     file_name = Column(String, nullable=False)
     created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     change_notes = Column(Text, nullable=True)
     
+    # Storage placement - "hot" (local uploads) or "cold" (see app/storage.py)
+    storage_tier = Column(String, default="hot", nullable=False, index=True)
+    last_accessed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Stored encoding ("gzip" or NULL for raw) and original/stored byte counts
+    content_encoding = Column(String, nullable=True)
+    size = Column(Integer, nullable=True)
+    stored_size = Column(Integer, nullable=True)
+    checksum = Column(String, nullable=True)  # SHA-256 of the stored bytes
+    
     # Relationships
     contract = relationship("Contract", back_populates="versions")
     created_by = relationship("User")
@@ -88,3 +111,58 @@ class Notification(Base):
     user = relationship("User", foreign_keys=[user_id])
     contract = relationship("Contract")
 
+
+class UserContractStats(Base):
+    """Per-user dashboard aggregates, kept current by the contract lifecycle handlers."""
+    __tablename__ = "user_contract_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+    # One counter per ContractStatus value
+    pending = Column(Integer, default=0, nullable=False)
+    signed = Column(Integer, default=0, nullable=False)
+    edited = Column(Integer, default=0, nullable=False)
+    denied = Column(Integer, default=0, nullable=False)
+    approved = Column(Integer, default=0, nullable=False)
+    complete = Column(Integer, default=0, nullable=False)
+    awaiting_my_approval = Column(Integer, default=0, nullable=False)
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ContractActivity(Base):
+    """Activity feed entry, written for both parties of a contract on every transition."""
+    __tablename__ = "contract_activity"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    actor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    type = Column(String, nullable=False)  # same values as Notification.type
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    contract = relationship("Contract")
+    actor = relationship("User", foreign_keys=[actor_id])
+    
+    __table_args__ = (
+        Index("ix_contract_activity_user_id_id", "user_id", "id"),
+    )
+
+
+class ScheduledJob(Base):
+    """A pending reminder, lock expiry or deadline check for one contract.
+
+    There is at most one job of each kind per contract; the scheduler picks due
+    jobs off the `run_at` index instead of scanning contracts.
+    """
+    __tablename__ = "scheduled_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # "reminder", "lock_expiry" or "deadline"
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    run_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_scheduled_jobs_kind_contract_id", "kind", "contract_id", unique=True),
+    )
@@ -0,0 +1,169 @@
+"""
+Per-user, per-route token-bucket rate limiting and backpressure.
+
+Each rule gives every user (or, for anonymous requests, every client address)
+its own bucket per route, kept in the `SharedState` backend so the limits hold
+across workers when `SHARED_STATE_URL` is shared. On top of that, each worker:
+
+- caps how many upload handlers (upload and edit) run at once, and
+- sheds polling requests first once it has too many requests in flight.
+
+Rejected requests get `429 Too Many Requests` (over the rate) or
+`503 Service Unavailable` (over capacity), both with `Retry-After`.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.shared_state import SharedState, get_shared_state
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    methods: Tuple[str, ...]
+    pattern: "re.Pattern"
+    per_minute: float
+    burst: int
+    polling: bool = False
+    upload: bool = False
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and self.pattern.match(path) is not None
+
+
+def default_rules() -> List[RateLimitRule]:
+    """Rules in match order; the first match wins."""
+    return [
+        RateLimitRule(
+            "upload", ("POST",), re.compile(r"^/api/contracts/upload/?$"),
+            settings.upload_rate_per_minute, settings.upload_burst, upload=True,
+        ),
+        RateLimitRule(
+            "edit", ("POST",), re.compile(r"^/api/contracts/\d+/edit/?$"),
+            settings.upload_rate_per_minute, settings.upload_burst, upload=True,
+        ),
+        RateLimitRule(
+            "notification-count", ("GET",), re.compile(r"^/api/notifications/count/?$"),
+            settings.poll_rate_per_minute, settings.poll_burst, polling=True,
+        ),
+        RateLimitRule(
+            "write", WRITE_METHODS, re.compile(r"^/api/(?!auth/)"),
+            settings.write_rate_per_minute, settings.write_burst,
+        ),
+    ]
+
+
+def client_identity(headers: Headers, scope: Scope) -> str:
+    """The token's subject for authenticated requests, else the client address."""
+    authorization = headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm]).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+async def reject(send: Send, status: int, detail: str, retry_after: float) -> None:
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: Optional[List[RateLimitRule]] = None,
+        state: Optional[SharedState] = None,
+        upload_concurrency: int = 4,
+        shed_polling_above: int = 64,
+    ):
+        self.app = app
+        self.rules = default_rules() if rules is None else rules
+        self._state = state
+        self.upload_concurrency = upload_concurrency
+        self.shed_polling_above = shed_polling_above
+        # Both counters are only touched from the event loop, so no lock is needed
+        self.in_flight = 0
+        self.uploads_in_flight = 0
+
+    @property
+    def state(self) -> SharedState:
+        if self._state is None:
+            self._state = get_shared_state()
+        return self._state
+
+    def match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.match(scope["method"], scope["path"])
+        # Cheap polling goes first when this worker is busy, before it costs a bucket lookup
+        if rule is not None and rule.polling and self.in_flight >= self.shed_polling_above:
+            await reject(send, 503, "Server busy, poll again later", 5)
+            return
+
+        # Requests count as in flight from here, including while they wait for a token
+        self.in_flight += 1
+        try:
+            await self.limit(rule, scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def limit(self, rule: Optional[RateLimitRule], scope: Scope, receive: Receive, send: Send) -> None:
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        identity = client_identity(Headers(scope=scope), scope)
+        # The SQLite backend may block on its write lock, so keep it off the event loop
+        wait = await run_in_threadpool(
+            self.state.take_token, f"ratelimit:{rule.name}:{identity}", rule.per_minute / 60, rule.burst
+        )
+        if wait:
+            await reject(send, 429, "Rate limit exceeded", wait)
+            return
+
+        if not rule.upload:
+            await self.app(scope, receive, send)
+            return
+        if self.uploads_in_flight >= self.upload_concurrency:
+            await reject(send, 503, "Too many uploads in progress", 1)
+            return
+        self.uploads_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.uploads_in_flight -= 1
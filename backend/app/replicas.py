@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Read-only routes depend on `get_read_db` (and `get_current_reader`) instead of
+`get_db`. With `REPLICA_URLS` set, those sessions go to the replicas in turn;
+without it they are ordinary primary sessions. A replica session refuses to
+flush, so a write on a read route fails loudly instead of landing on a replica.
+
+When a request's primary session commits a write, its user is marked in the
+shared state for `READ_YOUR_WRITES_SECONDS`, and until that expires their
+read routes use the primary, so they always see what they just did.
+
+A second SQLite file can stand in for a replica during development:
+
+    REPLICA_URLS='["sqlite:///./replica.db"]'
+    python -m app.replicas --sync    # copy the primary into every SQLite replica
+
+or set `REPLICA_SYNC_INTERVAL_SECONDS` to have the app copy it periodically.
+"""
+
+import argparse
+import itertools
+import logging
+import sqlite3
+import threading
+from typing import List
+
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import auth, models
+from app.config import settings
+from app.database import SessionLocal, engine, replica_engines
+from app.shared_state import get_shared_state
+
+logger = logging.getLogger(__name__)
+
+_replicas = itertools.cycle(replica_engines)
+_replicas_lock = threading.Lock()
+
+
+def ReadSessionLocal() -> Session:
+    """A session on the next replica, or on the primary when none are configured."""
+    if not replica_engines:
+        return SessionLocal()
+    with _replicas_lock:
+        bind = next(_replicas)
+    db = SessionLocal(bind=bind)
+    db.info["replica"] = True
+    return db
+
+
+def is_replica(db: Session) -> bool:
+    return db.info.get("replica", False)
+
+
+def sticky_key(subject: str) -> str:
+    return f"read-your-writes:{subject}"
+
+
+def recently_wrote(subject: str) -> bool:
+    return get_shared_state().get(sticky_key(subject)) is not None
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def refuse_replica_writes(session, flush_context, instances):
+    if is_replica(session):
+        raise RuntimeError("Attempted to write through a read-replica session")
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def note_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def mark_writer(session):
+    subject = session.info.get("subject")
+    if session.info.pop("wrote", False) and subject and replica_engines:
+        get_shared_state().set(sticky_key(subject), b"1", ttl=settings.read_your_writes_seconds)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def forget_write(session):
+    session.info.pop("wrote", None)
+
+
+def get_read_db(token: str = Depends(auth.oauth2_scheme)):
+    """Session for read-only routes: a replica, unless this user wrote moments ago."""
+    subject = auth.token_subject(token)
+    if subject is not None and replica_engines and recently_wrote(subject):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_current_reader(token: str = Depends(auth.oauth2_scheme), db: Session = Depends(get_read_db)) -> models.User:
+    """`get_current_user` for read-only routes, loaded through the same session."""
+    return auth.user_from_token(token, db)
+
+
+def sqlite_replica_paths() -> List[str]:
+    return [replica.url.database for replica in replica_engines if replica.url.get_backend_name() == "sqlite"]
+
+
+def sync_sqlite_replicas() -> int:
+    """Copy the primary SQLite database into every SQLite replica. Returns how many were copied."""
+    if engine.url.get_backend_name() != "sqlite":
+        return 0
+    paths = sqlite_replica_paths()
+    source = sqlite3.connect(engine.url.database)
+    try:
+        for path in paths:
+            target = sqlite3.connect(path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+    finally:
+        source.close()
+    return len(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync", action="store_true", help="copy the primary into every SQLite replica")
+    args = parser.parse_args()
+    if not replica_engines:
+        print("No replicas configured (set REPLICA_URLS).")
+        return
+    for replica in replica_engines:
+        print(f"  replica: {replica.url.render_as_string(hide_password=True)}")
+    if args.sync:
+        print(f"✓ Copied the primary into {sync_sqlite_replicas()} SQLite replica(s).")
+
+
+if __name__ == "__main__":
+    main()
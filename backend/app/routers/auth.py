@@ -28,6 +28,8 @@ def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password
     )
     db.add(db_user)
+    # Keep the new user's first reads on the primary, where their row already exists
+    db.info["subject"] = user.username
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -1,21 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Header, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, select
 from typing import List
-import os
-import shutil
+import mimetypes
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
+from urllib.parse import quote
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app import models, schemas, auth
+from app.activity import activity_feed, get_user_stats, snapshot, track_contract_change
+from app.cache import CachedResponse, contract_cache, etag_matches, make_etag
+from app.serialization import (
+    FAST_SERIALIZATION, NDJSON_MEDIA_TYPE, contract_list_rows, iter_contract_rows,
+    iter_version_rows, stream_ndjson, version_list_rows, wants_ndjson
+)
+from app.compression import accepts_encoding
+from app.config import settings
+from app.replicas import ReadSessionLocal, get_current_reader, get_read_db, is_replica
+from app.scheduler import schedule_contract, utc
+from app.storage import HOT, LocalStorage, get_storage, iter_decoded, locate, storage_key, store_upload
+from app.tiering import touch_access
 
 router = APIRouter()
 
-# Create uploads directory if it doesn't exist
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+def version_file_response(db: Session, version: models.ContractVersion, filename: str, accept_encoding: str = None):
+    """Stream a version's file from whichever storage tier holds it.
+
+    Compressed blobs are sent as stored with `Content-Encoding` when the client
+    accepts it, and decompressed on the fly otherwise.
+    """
+    key = storage_key(version.file_path)
+    try:
+        backend = locate(version.storage_tier, key)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    touch_access(db, version)
+    
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers = {}
+    chunks = None
+    if version.content_encoding:
+        headers["Vary"] = "Accept-Encoding"
+        if accepts_encoding(accept_encoding, version.content_encoding):
+            headers["Content-Encoding"] = version.content_encoding
+        else:
+            chunks = iter_decoded(backend.iter_chunks(key), version.content_encoding)
+    
+    if chunks is None and type(backend) is LocalStorage:
+        return FileResponse(backend.path(key), filename=filename, media_type=media_type, headers=headers)
+    headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+    return StreamingResponse(chunks or backend.iter_chunks(key), media_type=media_type, headers=headers)
 
 @router.post("/upload", response_model=schemas.ContractResponse, status_code=status.HTTP_201_CREATED)
 async def upload_contract(
@@ -24,12 +62,19 @@ async def upload_contract(
     recipient_username: str = Form(None),
     recipient_email: str = Form(None),
     notes: str = Form(None),
+    deadline: datetime = Form(None),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     if not recipient_username and not recipient_email:
         raise HTTPException(status_code=400, detail="Either recipient_username or recipient_email is required")
     
+    deadline = utc(deadline)
+    if deadline is None and settings.contract_deadline_days:
+        deadline = datetime.utcnow() + timedelta(days=settings.contract_deadline_days)
+    if deadline is not None and deadline <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Deadline must be in the future")
+    
     # Find recipient
     recipient = None
     if recipient_username:
@@ -43,35 +88,41 @@ async def upload_contract(
     if recipient.id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot send contract to yourself")
     
-    # Save file
+    # Save file to the hot tier, compressed when worthwhile
     file_extension = Path(file.filename).suffix
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    file_path = f"{uuid.uuid4()}{file_extension}"
+    blob = await run_in_threadpool(
+        store_upload, get_storage(HOT), file_path, file.file,
+        settings.compress_uploads, settings.upload_compression_level
+    )
     
     # Create contract
     contract = models.Contract(
         title=title,
-        file_path=str(file_path),
+        file_path=file_path,
         file_name=file.filename,
         sender_id=current_user.id,
         recipient_id=recipient.id,
-        notes=notes
+        notes=notes,
+        deadline=deadline
     )
     db.add(contract)
     db.commit()
     db.refresh(contract)
+    track_contract_change(db, None, contract, current_user.id, "new_contract")
     
     # Create initial version
     version = models.ContractVersion(
         contract_id=contract.id,
         version_number=1,
-        file_path=str(file_path),
+        file_path=file_path,
         file_name=file.filename,
         created_by_id=current_user.id,
-        change_notes="Initial version"
+        change_notes="Initial version",
+        content_encoding=blob.content_encoding,
+        size=blob.size,
+        stored_size=blob.stored_size,
+        checksum=blob.checksum
     )
     db.add(version)
     
@@ -83,6 +134,7 @@ async def upload_contract(
         message=f"New contract '{title}' from {current_user.username}"
     )
     db.add(notification)
+    schedule_contract(db, contract)
     
     db.commit()
     
@@ -96,9 +148,24 @@ async def upload_contract(
 
 @router.get("/", response_model=List[schemas.ContractResponse])
 def get_my_contracts(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    accept: str = Header(None),
+    current_user: models.User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
 ):
+    """List contracts sent or received. Send `Accept: application/x-ndjson` to stream one contract per line."""
+    if wants_ndjson(accept):
+        user_id = current_user.id
+        return StreamingResponse(
+            stream_ndjson(
+                lambda stream_db: iter_contract_rows(stream_db, user_id),
+                ReadSessionLocal if is_replica(db) else SessionLocal
+            ),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+    
+    if FAST_SERIALIZATION:
+        return ORJSONResponse(content=contract_list_rows(db, current_user.id))
+    
     contracts = db.query(models.Contract).options(
         joinedload(models.Contract.sender),
         joinedload(models.Contract.recipient),
@@ -111,28 +178,82 @@ def get_my_contracts(
     ).all()
     return contracts
 
+def contract_detail_response(entry: CachedResponse, if_none_match: str = None) -> Response:
+    """Serve a rendered contract, or 304 when the client already holds this version."""
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+@router.get("/stats", response_model=schemas.ContractStatsResponse)
+def get_contract_stats(
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Dashboard counts for the current user, read from the maintained aggregates."""
+    stats = get_user_stats(db, current_user.id)
+    return {
+        "total": stats.total,
+        "by_status": {status: getattr(stats, status.value) for status in models.ContractStatus},
+        "awaiting_my_approval": stats.awaiting_my_approval,
+        "last_activity_at": stats.last_activity_at,
+        "recent_activity": activity_feed(db, current_user.id, limit=5),
+    }
+
+@router.get("/activity", response_model=List[schemas.ActivityResponse])
+def get_activity(
+    limit: int = 20,
+    before_id: int = None,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Activity on the current user's contracts, newest first. Pass the last `id` as `before_id` for the next page."""
+    return activity_feed(db, current_user.id, limit=max(1, min(limit, 100)), before_id=before_id)
+
 @router.get("/{contract_id}", response_model=schemas.ContractResponse)
 def get_contract(
     contract_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    if_none_match: str = Header(None),
+    current_user: models.User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
 ):
-    contract = db.query(models.Contract).options(
-        joinedload(models.Contract.sender),
-        joinedload(models.Contract.recipient),
-        joinedload(models.Contract.versions).joinedload(models.ContractVersion.created_by)
-    ).filter(models.Contract.id == contract_id).first()
-    if not contract:
-        raise HTTPException(status_code=404, detail="Contract not found")
+    entry = contract_cache.get(contract_id)
+    if entry is not None:
+        # Writers outside this app's shared state (e.g. `python -m app.scheduler`
+        # run by hand with memory://) can't invalidate, so check the row's version
+        row_version = db.scalar(select(models.Contract.row_version).where(models.Contract.id == contract_id))
+        if row_version is None or entry.etag != make_etag(contract_id, row_version):
+            entry = None
+    if entry is None:
+        generation = contract_cache.generation
+        contract = db.query(models.Contract).options(
+            joinedload(models.Contract.sender),
+            joinedload(models.Contract.recipient),
+            joinedload(models.Contract.versions).joinedload(models.ContractVersion.created_by)
+        ).filter(models.Contract.id == contract_id).first()
+        if not contract:
+            raise HTTPException(status_code=404, detail="Contract not found")
+        
+        entry = CachedResponse(
+            etag=make_etag(contract.id, contract.row_version),
+            body=schemas.ContractResponse.model_validate(contract).model_dump_json().encode(),
+            sender_id=contract.sender_id,
+            recipient_id=contract.recipient_id,
+        )
+        # A lagging replica can return a version older than the last
+        # invalidation, so only primary reads may fill the shared cache
+        if not is_replica(db):
+            contract_cache.put(contract_id, entry, generation)
     
-    if contract.sender_id != current_user.id and contract.recipient_id != current_user.id:
+    if entry.sender_id != current_user.id and entry.recipient_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this contract")
     
-    return contract
+    return contract_detail_response(entry, if_none_match)
 
 @router.get("/{contract_id}/download")
 def download_contract(
     contract_id: int,
+    accept_encoding: str = Header(None),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -143,11 +264,15 @@ def download_contract(
     if contract.sender_id != current_user.id and contract.recipient_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to download this contract")
     
-    if not os.path.exists(contract.file_path):
+    # The contract's current file is its latest version's blob
+    version = db.query(models.ContractVersion).filter(
+        models.ContractVersion.contract_id == contract_id,
+        models.ContractVersion.file_path == contract.file_path
+    ).first()
+    if not version:
         raise HTTPException(status_code=404, detail="File not found")
     
-    from fastapi.responses import FileResponse
-    return FileResponse(contract.file_path, filename=contract.file_name)
+    return version_file_response(db, version, contract.file_name, accept_encoding)
 
 @router.post("/{contract_id}/lock")
 def lock_contract(
@@ -180,7 +305,9 @@ def lock_contract(
     else:
         raise HTTPException(status_code=400, detail="Action must be 'lock' or 'unlock'")
     
+    schedule_contract(db, contract)
     db.commit()
+    contract_cache.invalidate(contract_id)
     return {"message": f"Contract {lock_request.action}ed successfully"}
 
 @router.post("/{contract_id}/sign")
@@ -208,10 +335,13 @@ def sign_contract(
         )
     
     # Allow both sender and recipient to sign
+    before = snapshot(contract)
     contract.status = schemas.ContractStatus.SIGNED
     contract.signed_at = datetime.utcnow()
     contract.locked_by_id = None
     contract.locked_at = None
+    track_contract_change(db, before, contract, current_user.id, "contract_signed")
+    schedule_contract(db, contract)
     
     # Create notification for the other user
     other_user_id = contract.recipient_id if current_user.id == contract.sender_id else contract.sender_id
@@ -224,6 +354,7 @@ def sign_contract(
     db.add(notification)
     
     db.commit()
+    contract_cache.invalidate(contract_id)
     return {"message": "Contract signed successfully"}
 
 @router.post("/{contract_id}/deny")
@@ -243,12 +374,15 @@ def deny_contract(
     if contract.status == schemas.ContractStatus.SIGNED:
         raise HTTPException(status_code=400, detail="Cannot deny a signed contract")
     
+    before = snapshot(contract)
     contract.status = schemas.ContractStatus.DENIED
     contract.locked_by_id = None
     contract.locked_at = None
     # Reset approvals when denied
     contract.sender_approved = 0
     contract.recipient_approved = 0
+    track_contract_change(db, before, contract, current_user.id, "contract_denied")
+    schedule_contract(db, contract)
     
     # Create notification for the other user
     other_user_id = contract.recipient_id if current_user.id == contract.sender_id else contract.sender_id
@@ -261,6 +395,7 @@ def deny_contract(
     db.add(notification)
     
     db.commit()
+    contract_cache.invalidate(contract_id)
     return {"message": "Contract denied successfully"}
 
 @router.post("/{contract_id}/approve")
@@ -284,6 +419,7 @@ def approve_contract(
         raise HTTPException(status_code=400, detail="Contract is already complete")
     
     # Set approval based on user role
+    before = snapshot(contract)
     if current_user.id == contract.sender_id:
         contract.sender_approved = 1
     else:
@@ -292,8 +428,11 @@ def approve_contract(
     # Check if both sides have approved - mark as complete
     if contract.sender_approved == 1 and contract.recipient_approved == 1:
         contract.status = schemas.ContractStatus.COMPLETE
+    track_contract_change(db, before, contract, current_user.id, "contract_approved")
+    schedule_contract(db, contract)
     
     db.commit()
+    contract_cache.invalidate(contract_id)
     
     # Create notification for the other user
     other_user_id = contract.recipient_id if current_user.id == contract.sender_id else contract.sender_id
@@ -332,6 +471,7 @@ async def edit_contract(
         )
     
     # Lock the contract for editing
+    before = snapshot(contract)
     contract.locked_by_id = current_user.id
     contract.locked_at = datetime.utcnow()
     
@@ -342,16 +482,16 @@ async def edit_contract(
     
     next_version = (max_version.version_number + 1) if max_version else 1
     
-    # Save new version of file
+    # Save new version of file to the hot tier, compressed when worthwhile
     file_extension = Path(file.filename).suffix
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    file_path = f"{uuid.uuid4()}{file_extension}"
+    blob = await run_in_threadpool(
+        store_upload, get_storage(HOT), file_path, file.file,
+        settings.compress_uploads, settings.upload_compression_level
+    )
     
     # Update contract with new file
-    contract.file_path = str(file_path)
+    contract.file_path = file_path
     contract.file_name = file.filename
     contract.status = schemas.ContractStatus.EDITED
     contract.updated_at = datetime.utcnow()
@@ -360,10 +500,14 @@ async def edit_contract(
     version = models.ContractVersion(
         contract_id=contract.id,
         version_number=next_version,
-        file_path=str(file_path),
+        file_path=file_path,
         file_name=file.filename,
         created_by_id=current_user.id,
-        change_notes=change_notes or f"Version {next_version} edited"
+        change_notes=change_notes or f"Version {next_version} edited",
+        content_encoding=blob.content_encoding,
+        size=blob.size,
+        stored_size=blob.stored_size,
+        checksum=blob.checksum
     )
     db.add(version)
     
@@ -387,6 +531,9 @@ async def edit_contract(
     else:
         contract.status = schemas.ContractStatus.EDITED
     
+    track_contract_change(db, before, contract, current_user.id, "contract_edited")
+    schedule_contract(db, contract)
+    
     # Create notification for the other user (sender or recipient)
     other_user_id = contract.recipient_id if current_user.id == contract.sender_id else contract.sender_id
     notification = models.Notification(
@@ -398,6 +545,7 @@ async def edit_contract(
     db.add(notification)
     
     db.commit()
+    contract_cache.invalidate(contract_id)
     
     # Reload with relationships
     contract = db.query(models.Contract).options(
@@ -411,9 +559,11 @@ async def edit_contract(
 @router.get("/{contract_id}/versions", response_model=List[schemas.ContractVersionResponse])
 def get_contract_versions(
     contract_id: int,
+    accept: str = Header(None),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
+    """List versions, newest first. Send `Accept: application/x-ndjson` to stream one version per line."""
     contract = db.query(models.Contract).filter(models.Contract.id == contract_id).first()
     if not contract:
         raise HTTPException(status_code=404, detail="Contract not found")
@@ -421,6 +571,17 @@ def get_contract_versions(
     if contract.sender_id != current_user.id and contract.recipient_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view versions of this contract")
     
+    if wants_ndjson(accept):
+        return StreamingResponse(
+            stream_ndjson(lambda stream_db: iter_version_rows(
+                stream_db, models.ContractVersion.contract_id == contract_id
+            )),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+    
+    if FAST_SERIALIZATION:
+        return ORJSONResponse(content=version_list_rows(db, contract_id))
+    
     versions = db.query(models.ContractVersion).options(
         joinedload(models.ContractVersion.created_by)
     ).filter(
@@ -433,6 +594,7 @@ def get_contract_versions(
 def download_version(
     contract_id: int,
     version_id: int,
+    accept_encoding: str = Header(None),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -451,9 +613,5 @@ def download_version(
     if not version:
         raise HTTPException(status_code=404, detail="Version not found")
     
-    if not os.path.exists(version.file_path):
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    from fastapi.responses import FileResponse
-    return FileResponse(version.file_path, filename=version.file_name)
+    return version_file_response(db, version, version.file_name, accept_encoding)
 
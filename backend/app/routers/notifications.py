@@ -4,13 +4,14 @@ from typing import List
 from sqlalchemy import and_
 from app.database import get_db
 from app import models, schemas, auth
+from app.replicas import get_current_reader, get_read_db
 
 router = APIRouter()
 
 @router.get("/count")
 def get_notification_count(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
 ):
     """Get count of unread notifications"""
     count = db.query(models.Notification).filter(
@@ -23,8 +24,8 @@ def get_notification_count(
 
 @router.get("/", response_model=List[schemas.NotificationResponse])
 def get_notifications(
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db),
     limit: int = 20
 ):
     """Get user notifications"""
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, or_
 from typing import List
 from app.database import get_db
 from app import models, schemas, auth
+from app.cache import contract_cache
+from app.replicas import get_current_reader, get_read_db
 
 router = APIRouter()
 
@@ -11,8 +13,8 @@ router = APIRouter()
 def get_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_reader)
 ):
     users = db.query(models.User).offset(skip).limit(limit).all()
     return users
@@ -20,8 +22,8 @@ def get_users(
 @router.get("/search")
 def search_users(
     q: str,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
 ):
     """Search users by username or email"""
     users = db.query(models.User).filter(
@@ -60,7 +62,24 @@ def update_profile(
         from app import auth as auth_module
         current_user.hashed_password = auth_module.get_password_hash(user_update.password)
     
+    # Contract responses embed the user, so move their version tokens forward
+    contract_ids = []
+    if user_update.email is not None or user_update.full_name is not None:
+        user_contracts = db.query(models.Contract).filter(
+            or_(
+                models.Contract.sender_id == current_user.id,
+                models.Contract.recipient_id == current_user.id
+            )
+        )
+        contract_ids = [contract_id for (contract_id,) in user_contracts.with_entities(models.Contract.id)]
+        user_contracts.update({
+            models.Contract.row_version: models.Contract.row_version + 1,
+            models.Contract.updated_at: models.Contract.updated_at
+        }, synchronize_session=False)
+    
     db.commit()
+    if contract_ids:
+        contract_cache.invalidate(*contract_ids)
     db.refresh(current_user)
     return current_user
 
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Reminders, lock expiry and deadlines for contracts, driven by a job table.
+
+Lifecycle handlers call `schedule_contract` whenever a contract changes, which
+keeps at most one `scheduled_jobs` row per kind and contract:
+
+- reminder:     notify parties who have not approved a PENDING or EDITED
+                contract `REMINDER_AFTER_DAYS` after its last change, and
+                again every as many days while it stays stalled
+- lock_expiry:  release edit locks held longer than `LOCK_TIMEOUT_MINUTES`
+- deadline:     deny contracts still open when their `deadline` passes
+
+Every `SCHEDULER_INTERVAL_SECONDS` the app picks due jobs off the `run_at`
+index in batches. A job re-checks its contract when it runs, so jobs made
+stale by later changes simply reschedule or drop themselves. By hand:
+
+    python -m app.scheduler              # run due jobs once
+    python -m app.scheduler --backfill   # create jobs for existing contracts
+"""
+
+import argparse
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import delete, inspect, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models
+from app.activity import snapshot, track_contract_change
+from app.cache import contract_cache
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+REMINDER = "reminder"
+LOCK_EXPIRY = "lock_expiry"
+DEADLINE = "deadline"
+
+AWAITING_STATUSES = (models.ContractStatus.PENDING, models.ContractStatus.EDITED)
+OPEN_STATUSES = AWAITING_STATUSES + (models.ContractStatus.APPROVED,)
+
+# A job that fails is retried after this long instead of blocking the batch
+RETRY_DELAY = timedelta(minutes=5)
+
+
+def utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC, which is what SQLite hands back for every DateTime column."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def schedule(db: Session, kind: str, contract_id: int, run_at: Optional[datetime]) -> None:
+    """Create, move or (with run_at=None) cancel a contract's job of `kind`. Does not commit.
+
+    Single statements rather than a lookup and then a write, so two handlers on
+    one contract, or a handler and the scheduler thread, can't trip over each
+    other's rows.
+    """
+    job_filter = (models.ScheduledJob.kind == kind, models.ScheduledJob.contract_id == contract_id)
+    if run_at is None:
+        db.execute(delete(models.ScheduledJob).where(*job_filter))
+        return
+    upsert = UPSERTS.get(db.get_bind().dialect.name)
+    if upsert is None:
+        job = db.query(models.ScheduledJob).filter(*job_filter).first()
+        if job is None:
+            db.add(models.ScheduledJob(kind=kind, contract_id=contract_id, run_at=run_at))
+        else:
+            job.run_at = run_at
+        return
+    db.execute(upsert(models.ScheduledJob).values(kind=kind, contract_id=contract_id, run_at=run_at).on_conflict_do_update(
+        index_elements=["kind", "contract_id"], set_={"run_at": run_at}
+    ))
+
+
+def reminder_due(contract: models.Contract) -> Optional[datetime]:
+    if not settings.reminder_after_days or contract.status not in AWAITING_STATUSES:
+        return None
+    last_change = utc(contract.updated_at or contract.created_at) or datetime.utcnow()
+    return last_change + timedelta(days=settings.reminder_after_days)
+
+
+def lock_expiry_due(contract: models.Contract) -> Optional[datetime]:
+    if not settings.lock_timeout_minutes or contract.locked_by_id is None:
+        return None
+    return (utc(contract.locked_at) or datetime.utcnow()) + timedelta(minutes=settings.lock_timeout_minutes)
+
+
+def deadline_due(contract: models.Contract) -> Optional[datetime]:
+    if contract.deadline is None or contract.status not in OPEN_STATUSES:
+        return None
+    return utc(contract.deadline)
+
+
+DUE = {
+    REMINDER: reminder_due,
+    LOCK_EXPIRY: lock_expiry_due,
+    DEADLINE: deadline_due,
+}
+
+
+def schedule_contract(db: Session, contract: models.Contract) -> None:
+    """Bring all of a contract's jobs in line with its current state. Does not commit."""
+    db.flush()  # so updated_at reflects the change being made
+    for kind, due in DUE.items():
+        schedule(db, kind, contract.id, due(contract))
+
+
+def send_reminder(db: Session, contract: models.Contract, now: datetime) -> Optional[datetime]:
+    for user_id, approved in (
+        (contract.sender_id, contract.sender_approved),
+        (contract.recipient_id, contract.recipient_approved),
+    ):
+        if not approved:
+            db.add(models.Notification(
+                user_id=user_id,
+                contract_id=contract.id,
+                type="contract_reminder",
+                message=f"Contract '{contract.title}' is still awaiting your approval"
+            ))
+    return now + timedelta(days=settings.reminder_after_days)
+
+
+def expire_lock(db: Session, contract: models.Contract, now: datetime) -> Optional[datetime]:
+    contract.locked_by_id = None
+    contract.locked_at = None
+    return None
+
+
+def deny_past_deadline(db: Session, contract: models.Contract, now: datetime) -> Optional[datetime]:
+    before = snapshot(contract)
+    contract.status = models.ContractStatus.DENIED
+    contract.locked_by_id = None
+    contract.locked_at = None
+    contract.sender_approved = 0
+    contract.recipient_approved = 0
+    # The sender set the deadline, so the expiry is recorded as theirs
+    track_contract_change(db, before, contract, contract.sender_id, "contract_expired")
+    for user_id in (contract.sender_id, contract.recipient_id):
+        db.add(models.Notification(
+            user_id=user_id,
+            contract_id=contract.id,
+            type="contract_expired",
+            message=f"Contract '{contract.title}' passed its deadline and was denied"
+        ))
+    # Reminders and lock expiry no longer apply to a denied contract
+    schedule(db, REMINDER, contract.id, None)
+    schedule(db, LOCK_EXPIRY, contract.id, None)
+    return None
+
+
+# Each action runs once its job is due and returns when to run again, if ever
+ACTIONS: Dict[str, Callable[[Session, models.Contract, datetime], Optional[datetime]]] = {
+    REMINDER: send_reminder,
+    LOCK_EXPIRY: expire_lock,
+    DEADLINE: deny_past_deadline,
+}
+
+# Actions that modify the contract, so its cached response must go
+CHANGES_CONTRACT = (LOCK_EXPIRY, DEADLINE)
+
+
+def run_job(db: Session, job: models.ScheduledJob, now: datetime) -> None:
+    contract = db.get(models.Contract, job.contract_id)
+    due = DUE[job.kind](contract) if contract is not None else None
+    changed = False
+    if due is not None and due <= now:
+        next_run = ACTIONS[job.kind](db, contract, now)
+        changed = job.kind in CHANGES_CONTRACT
+    else:
+        # The contract changed since the job was scheduled
+        next_run = due
+    if next_run is None or next_run <= now:
+        db.delete(job)
+    else:
+        job.run_at = next_run
+    db.commit()
+    if changed:
+        contract_cache.invalidate(contract.id)
+
+
+def run_due_jobs(batch_size: int = None) -> int:
+    """Run every job due now, oldest first, in batches. Returns how many ran."""
+    batch_size = batch_size or settings.scheduler_batch_size
+    now = datetime.utcnow()
+    processed = 0
+    db = SessionLocal()
+    try:
+        while True:
+            jobs = db.query(models.ScheduledJob).filter(
+                models.ScheduledJob.run_at <= now
+            ).order_by(models.ScheduledJob.run_at, models.ScheduledJob.id).limit(batch_size).all()
+            if not jobs:
+                break
+            for job in jobs:
+                if inspect(job).was_deleted:
+                    # Cancelled by an earlier job for the same contract in this batch
+                    continue
+                job_id, kind, contract_id = job.id, job.kind, job.contract_id
+                try:
+                    run_job(db, job, now)
+                    processed += 1
+                except Exception:
+                    logger.exception("Scheduled %s job for contract %s failed", kind, contract_id)
+                    db.rollback()
+                    db.query(models.ScheduledJob).filter(models.ScheduledJob.id == job_id).update(
+                        {models.ScheduledJob.run_at: now + RETRY_DELAY}, synchronize_session=False
+                    )
+                    db.commit()
+    finally:
+        db.close()
+    if processed:
+        logger.info("Ran %d scheduled job(s)", processed)
+    return processed
+
+
+def backfill(batch_size: int = None) -> int:
+    """Schedule jobs for contracts that predate the scheduler. Returns contracts visited."""
+    batch_size = batch_size or settings.scheduler_batch_size
+    visited = 0
+    after_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            contracts = db.query(models.Contract).filter(
+                models.Contract.id > after_id,
+                or_(models.Contract.status.in_(OPEN_STATUSES), models.Contract.locked_by_id.isnot(None))
+            ).order_by(models.Contract.id).limit(batch_size).all()
+            if not contracts:
+                break
+            for contract in contracts:
+                after_id = contract.id
+                schedule_contract(db, contract)
+            db.commit()
+            visited += len(contracts)
+    finally:
+        db.close()
+    return visited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backfill", action="store_true", help="schedule jobs for existing contracts first")
+    parser.add_argument("--batch-size", type=int, default=settings.scheduler_batch_size)
+    args = parser.parse_args()
+    if args.backfill:
+        print(f"✓ Scheduled jobs for {backfill(args.batch_size)} open or locked contract(s).")
+    print(f"✓ Ran {run_due_jobs(args.batch_size)} due job(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -62,6 +62,7 @@ class ContractResponse(BaseModel):
     locked_at: Optional[datetime]
     sender_approved: int
     recipient_approved: int
+    deadline: Optional[datetime] = None
     sender: UserResponse
     recipient: UserResponse
     versions: list[ContractVersionResponse] = []
@@ -95,3 +96,20 @@ class NotificationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+class ActivityResponse(BaseModel):
+    id: int
+    contract_id: int
+    contract_title: str
+    contract_status: ContractStatus
+    actor_id: int
+    actor_username: str
+    type: str
+    created_at: datetime
+
+class ContractStatsResponse(BaseModel):
+    total: int
+    by_status: dict[ContractStatus, int]
+    awaiting_my_approval: int
+    last_activity_at: Optional[datetime]
+    recent_activity: list[ActivityResponse] = []
@@ -0,0 +1,183 @@
+"""
+Fast serialization path for large list responses.
+
+Builds `ContractResponse`/`ContractVersionResponse` shaped dicts from
+column-projected Core queries instead of hydrating ORM objects through the
+identity map, and renders them with orjson. The row iterators read straight
+from the DB cursor, so the NDJSON variants stream with flat memory use.
+"""
+
+from typing import Callable, Iterator, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import bindparam, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+FAST_SERIALIZATION = settings.fast_serialization
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Rows fetched from the cursor (and NDJSON lines flushed) per batch
+STREAM_BATCH_SIZE = 500
+
+USER_FIELDS = ("id", "username", "email", "full_name", "created_at")
+
+CONTRACT_COLUMNS = (
+    models.Contract.id,
+    models.Contract.title,
+    models.Contract.file_name,
+    models.Contract.sender_id,
+    models.Contract.recipient_id,
+    models.Contract.status,
+    models.Contract.notes,
+    models.Contract.created_at,
+    models.Contract.updated_at,
+    models.Contract.signed_at,
+    models.Contract.locked_by_id,
+    models.Contract.locked_at,
+    models.Contract.sender_approved,
+    models.Contract.recipient_approved,
+    models.Contract.deadline,
+)
+
+VERSION_COLUMNS = (
+    models.ContractVersion.id,
+    models.ContractVersion.contract_id,
+    models.ContractVersion.version_number,
+    models.ContractVersion.file_name,
+    models.ContractVersion.created_by_id,
+    models.ContractVersion.created_at,
+    models.ContractVersion.change_notes,
+)
+
+CONTRACT_FIELDS = tuple(column.key for column in CONTRACT_COLUMNS)
+VERSION_FIELDS = tuple(column.key for column in VERSION_COLUMNS)
+
+
+def user_columns(user):
+    return tuple(getattr(user, field) for field in USER_FIELDS)
+
+
+def unpack(row, *field_groups: Sequence[str]) -> List[dict]:
+    """Split a flat result row into one dict per group of field names."""
+    dicts = []
+    start = 0
+    for fields in field_groups:
+        dicts.append(dict(zip(fields, row[start:start + len(fields)])))
+        start += len(fields)
+    return dicts
+
+
+def user_contracts_filter(user_id: int):
+    return or_(
+        models.Contract.sender_id == user_id,
+        models.Contract.recipient_id == user_id
+    )
+
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+# Built once: coercing the projected columns costs more than running the query
+# for a single contract's handful of versions
+VERSION_ROWS = select(*VERSION_COLUMNS, *user_columns(models.User)).join(
+    models.User, models.User.id == models.ContractVersion.created_by_id
+)
+
+VERSION_LIST_QUERY = VERSION_ROWS.where(
+    models.ContractVersion.contract_id == bindparam("contract_id")
+).order_by(models.ContractVersion.version_number.desc())
+
+
+def version_dicts(rows) -> Iterator[dict]:
+    for row in rows:
+        version, user = unpack(row, VERSION_FIELDS, USER_FIELDS)
+        version["created_by"] = user
+        yield version
+
+
+def iter_version_rows(db: Session, *criteria, order_by=()) -> Iterator[dict]:
+    return version_dicts(db.execute(
+        VERSION_ROWS.where(*criteria).order_by(
+            *order_by, models.ContractVersion.version_number.desc()
+        ).execution_options(yield_per=STREAM_BATCH_SIZE)
+    ))
+
+
+def iter_contract_rows(db: Session, user_id: int) -> Iterator[dict]:
+    """Yield `get_my_contracts` rows in id order with their versions attached.
+
+    Contracts and versions are read from two cursors sorted by contract id and
+    merged, so only the current contract's versions are held in memory.
+    """
+    user_filter = user_contracts_filter(user_id)
+    sender = aliased(models.User)
+    recipient = aliased(models.User)
+
+    contract_rows = db.execute(
+        select(*CONTRACT_COLUMNS, *user_columns(sender), *user_columns(recipient)).join(
+            sender, sender.id == models.Contract.sender_id
+        ).join(
+            recipient, recipient.id == models.Contract.recipient_id
+        ).where(user_filter).order_by(
+            models.Contract.id
+        ).execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    versions = iter_version_rows(
+        db,
+        models.ContractVersion.contract_id.in_(select(models.Contract.id).where(user_filter)),
+        order_by=(models.ContractVersion.contract_id,)
+    )
+
+    pending = next(versions, None)
+    for row in contract_rows:
+        contract, sender_user, recipient_user = unpack(
+            row, CONTRACT_FIELDS, USER_FIELDS, USER_FIELDS
+        )
+        contract["sender"] = sender_user
+        contract["recipient"] = recipient_user
+        contract["versions"] = []
+        while pending is not None and pending["contract_id"] == contract["id"]:
+            contract["versions"].append(pending)
+            pending = next(versions, None)
+        yield contract
+
+
+def contract_list_rows(db: Session, user_id: int) -> List[dict]:
+    """Build the `get_my_contracts` payload without hydrating ORM objects."""
+    return list(iter_contract_rows(db, user_id))
+
+
+def version_list_rows(db: Session, contract_id: int) -> List[dict]:
+    """Build the `get_contract_versions` payload with a single joined projection."""
+    return list(version_dicts(db.execute(VERSION_LIST_QUERY, {"contract_id": contract_id})))
+
+
+def stream_ndjson(
+    rows: Callable[[Session], Iterator[dict]],
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> Iterator[bytes]:
+    """Render rows as NDJSON batches from a session owned by the stream itself.
+
+    The request's `get_db` session is closed before a streaming body is sent,
+    so the generator opens its own (from `session_factory`, so it reads from
+    the same database as the request; `SessionLocal` by default) and closes it
+    once the cursor is drained.
+    """
+    db = (session_factory or SessionLocal)()
+    try:
+        batch = []
+        for row in rows(db):
+            batch.append(orjson.dumps(row))
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield b"\n".join(batch) + b"\n"
+                batch = []
+        if batch:
+            yield b"\n".join(batch) + b"\n"
+    finally:
+        db.close()
@@ -0,0 +1,377 @@
+"""
+Pluggable state shared between worker processes: a key/value cache with
+counters, token buckets, named locks with a TTL, and pub/sub.
+
+`MemorySharedState` is process-local and only correct with a single worker.
+`SQLiteSharedState` keeps everything in one SQLite file, so every worker on a
+host sees the same cache entries, locks and messages. Pick one with
+`SHARED_STATE_URL` ("memory://" or "sqlite:///path/to/state.db").
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+Subscriber = Callable[[str], None]
+
+
+class SharedState(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value stored under `key`, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store `value` under `key`, optionally expiring after `ttl` seconds."""
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        """Remove keys; missing keys are ignored."""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        """Remove every key starting with `prefix`."""
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1) -> int:
+        """Atomically add `amount` to a counter (starting at 0) and return the new value."""
+
+    @abstractmethod
+    def counter(self, key: str) -> int:
+        """Current value of a counter (0 if it was never incremented), without writing."""
+
+    @abstractmethod
+    def take_token(self, key: str, rate: float, capacity: float, cost: float = 1) -> float:
+        """Take `cost` tokens from the bucket `key`, which holds up to `capacity`
+        and refills at `rate` tokens per second. Returns 0 on success, otherwise
+        the seconds until enough tokens are available (nothing is taken)."""
+
+    @abstractmethod
+    def acquire_lock(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or refresh the lock `name` for `owner`; False if someone else holds it."""
+
+    @abstractmethod
+    def release_lock(self, name: str, owner: str) -> None:
+        """Release `name` if `owner` holds it."""
+
+    @abstractmethod
+    def publish(self, channel: str, message: str) -> None:
+        """Deliver `message` to every subscriber of `channel` in every worker."""
+
+    @abstractmethod
+    def subscribe(self, channel: str, callback: Subscriber) -> None:
+        """Call `callback(message)` for messages published on `channel` from now on."""
+
+    def close(self) -> None:
+        pass
+
+
+def refill_and_take(tokens: float, elapsed: float, rate: float, capacity: float, cost: float) -> Tuple[float, float]:
+    """Token-bucket step: returns the new token count and the wait (0 if `cost` was taken)."""
+    tokens = min(capacity, tokens + max(elapsed, 0) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+class MemorySharedState(SharedState):
+    """In-process implementation for single-worker deployments and development."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._values: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._locks: Dict[str, Tuple[str, float]] = {}
+        self._subscribers: Dict[str, List[Subscriber]] = {}
+        self._mutex = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._mutex:
+            item = self._values.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._values[key]
+                return None
+            self._values.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._mutex:
+            self._values[key] = (value, time.time() + ttl if ttl else None)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._mutex:
+            for key in keys:
+                self._values.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._mutex:
+            for key in [key for key in self._values if key.startswith(prefix)]:
+                del self._values[key]
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._mutex:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            return self._counters[key]
+
+    def counter(self, key: str) -> int:
+        with self._mutex:
+            return self._counters.get(key, 0)
+
+    def take_token(self, key: str, rate: float, capacity: float, cost: float = 1) -> float:
+        now = time.monotonic()
+        with self._mutex:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens, wait = refill_and_take(tokens, now - updated_at, rate, capacity, cost)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Dropping the least recently used bucket only ever refills it early
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def acquire_lock(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._mutex:
+            holder = self._locks.get(name)
+            if holder is not None and holder[0] != owner and holder[1] > now:
+                return False
+            self._locks[name] = (owner, now + ttl)
+            return True
+
+    def release_lock(self, name: str, owner: str) -> None:
+        with self._mutex:
+            holder = self._locks.get(name)
+            if holder is not None and holder[0] == owner:
+                del self._locks[name]
+
+    def publish(self, channel: str, message: str) -> None:
+        with self._mutex:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for callback in subscribers:
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Subscriber) -> None:
+        with self._mutex:
+            self._subscribers.setdefault(channel, []).append(callback)
+
+
+class SQLiteSharedState(SharedState):
+    """File-backed implementation shared by all workers on one host.
+
+    Uses WAL mode so readers never block the writer. Pub/sub is a message table
+    tailed by a background thread in each subscribing process; messages older
+    than `message_retention` seconds are pruned.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS kv (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            expires_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS counters (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            full_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS locks (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL,
+            message TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.2, message_retention: float = 60.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.message_retention = message_retention
+        self._local = threading.local()
+        self._subscribers: Dict[str, List[Subscriber]] = {}
+        self._subscribers_lock = threading.Lock()
+        self._poller: Optional[threading.Thread] = None
+        self._poller_pid: Optional[int] = None
+        self._closed = threading.Event()
+        self._writes = 0
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, re-opened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connect().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl if ttl else None)
+        )
+        self._writes += 1
+        if self._writes % 500 == 0:
+            conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._connect().executemany("DELETE FROM kv WHERE key = ?", [(key,) for key in keys])
+
+    def delete_prefix(self, prefix: str) -> None:
+        # A range scan on the primary key; LIKE would need escaping and skip the index
+        self._connect().execute(
+            "DELETE FROM kv WHERE key >= ? AND key < ?", (prefix, prefix + "\U0010ffff")
+        )
+
+    def counter(self, key: str) -> int:
+        row = self._connect().execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO counters (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                (key, amount)
+            )
+            value = conn.execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def take_token(self, key: str, rate: float, capacity: float, cost: float = 1) -> float:
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            tokens, wait = refill_and_take(tokens, now - updated_at, rate, capacity, cost)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (capacity - tokens) / rate)
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                # A bucket that has refilled completely is the same as no row
+                conn.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire_lock(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO locks (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE locks.owner = excluded.owner OR locks.expires_at <= ?",
+                (name, owner, now + ttl, now)
+            )
+            holder = conn.execute("SELECT owner FROM locks WHERE name = ?", (name,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return holder == owner
+
+    def release_lock(self, name: str, owner: str) -> None:
+        self._connect().execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+    def publish(self, channel: str, message: str) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO messages (channel, message, created_at) VALUES (?, ?, ?)",
+            (channel, message, now)
+        )
+        conn.execute("DELETE FROM messages WHERE created_at < ?", (now - self.message_retention,))
+
+    def subscribe(self, channel: str, callback: Subscriber) -> None:
+        with self._subscribers_lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+            if self._poller is None or self._poller_pid != os.getpid():
+                self._poller = threading.Thread(target=self._poll, name="shared-state-pubsub", daemon=True)
+                self._poller_pid = os.getpid()
+                self._poller.start()
+
+    def _poll(self) -> None:
+        conn = self._connect()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM messages").fetchone()[0]
+        while not self._closed.wait(self.poll_interval):
+            rows = conn.execute(
+                "SELECT id, channel, message FROM messages WHERE id > ? ORDER BY id", (last_id,)
+            ).fetchall()
+            for message_id, channel, message in rows:
+                last_id = message_id
+                with self._subscribers_lock:
+                    subscribers = list(self._subscribers.get(channel, ()))
+                for callback in subscribers:
+                    callback(message)
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+def create_shared_state(url: str) -> SharedState:
+    if url.startswith("memory://"):
+        return MemorySharedState()
+    if url.startswith("sqlite:///"):
+        return SQLiteSharedState(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+_shared_state: Optional[SharedState] = None
+_shared_state_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    """Return the process-wide backend configured by `SHARED_STATE_URL`, creating it on first use."""
+    global _shared_state
+    if _shared_state is None:
+        with _shared_state_lock:
+            if _shared_state is None:
+                _shared_state = create_shared_state(settings.shared_state_url)
+    return _shared_state
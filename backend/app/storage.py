@@ -0,0 +1,407 @@
+"""
+Storage backends for uploaded contract files.
+
+Every `ContractVersion` records which tier holds its blob (`storage_tier`) and
+the blob's key (the file name part of `file_path`). The hot tier is always the
+local upload directory; the cold tier is configured with `COLD_STORAGE_URL`:
+
+    archive://./cold_storage          gzip-compressed files on local disk
+    s3://bucket                       S3 (needs boto3; see S3_ENDPOINT_URL)
+    objectstore://./object_store/bk   S3-compatible stand-in on local disk
+
+Uploads are gzip-compressed before they reach a backend unless the content is
+already compressed or would not shrink; `ContractVersion.content_encoding`
+records which, so downloads can pass the stored bytes through or decode them.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional
+
+from app.config import settings
+
+HOT = "hot"
+COLD = "cold"
+
+CHUNK_SIZE = 64 * 1024
+
+GZIP = "gzip"
+
+# Leading bytes of formats that are already compressed (zip covers DOCX/XLSX/ODT)
+COMPRESSED_SIGNATURES = (
+    b"PK\x03\x04",          # zip
+    b"\x1f\x8b",             # gzip
+    b"\x28\xb5\x2f\xfd",     # zstd
+    b"BZh",                  # bzip2
+    b"\xfd7zXZ\x00",         # xz
+    b"7z\xbc\xaf\x27\x1c",    # 7z
+    b"Rar!",                 # rar
+    b"\x89PNG",               # png
+    b"\xff\xd8\xff",          # jpeg
+    b"GIF8",                 # gif
+)
+
+# Keep the compressed copy only if it saves at least this fraction
+MIN_COMPRESSION_SAVING = 0.1
+
+
+def storage_key(file_path: str) -> str:
+    """Blob key for a stored `file_path` (older rows store "uploads/<key>")."""
+    return Path(file_path).name
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    modified: float  # unix timestamp
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def save(self, key: str, fileobj: BinaryIO) -> int:
+        """Store the stream under `key` and return the number of bytes read."""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Open the blob for reading; raises FileNotFoundError if it is missing."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def iter_keys(self) -> Iterator[StoredObject]:
+        """Yield every stored blob, lazily, in no particular order."""
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with self.open(key) as stream:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def save(self, key: str, fileobj: BinaryIO) -> int:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.path(key), "wb") as buffer:
+            shutil.copyfileobj(fileobj, buffer)
+            return buffer.tell()
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).is_file()
+
+    def delete(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+    def key_for(self, name: str) -> Optional[str]:
+        return None if name.startswith(".") else name
+
+    def iter_keys(self) -> Iterator[StoredObject]:
+        if not self.root.is_dir():
+            return
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                key = self.key_for(entry.name)
+                if key is not None and entry.is_file():
+                    stat = entry.stat()
+                    yield StoredObject(key, stat.st_size, stat.st_mtime)
+
+
+class ArchiveStorage(LocalStorage):
+    """Local storage that gzip-compresses blobs; reads decompress as a stream.
+
+    Blobs that are already compressed (gzip-encoded uploads, DOCX, images, ...)
+    are kept as they are under `<key>.raw` rather than compressed twice.
+    """
+
+    SUFFIXES = (".gz", ".raw")
+
+    def path(self, key: str) -> Path:
+        raw = self.root / f"{key}.raw"
+        return raw if raw.is_file() else self.root / f"{key}.gz"
+
+    def save(self, key: str, fileobj: BinaryIO) -> int:
+        self.root.mkdir(parents=True, exist_ok=True)
+        head = fileobj.read(CHUNK_SIZE)
+        if looks_compressed(head):
+            target, stale = self.root / f"{key}.raw", self.root / f"{key}.gz"
+            archive = open(target, "wb")
+        else:
+            target, stale = self.root / f"{key}.gz", self.root / f"{key}.raw"
+            archive = gzip.open(target, "wb")
+        size = 0
+        with archive:
+            chunk = head
+            while chunk:
+                archive.write(chunk)
+                size += len(chunk)
+                chunk = fileobj.read(CHUNK_SIZE)
+        stale.unlink(missing_ok=True)
+        return size
+
+    def open(self, key: str) -> BinaryIO:
+        path = self.path(key)
+        return open(path, "rb") if path.suffix == ".raw" else gzip.open(path, "rb")
+
+    def delete(self, key: str) -> None:
+        for suffix in self.SUFFIXES:
+            (self.root / f"{key}{suffix}").unlink(missing_ok=True)
+
+    def key_for(self, name: str) -> Optional[str]:
+        if name.startswith("."):
+            return None
+        for suffix in self.SUFFIXES:
+            if name.endswith(suffix):
+                return name[:-len(suffix)]
+        return None
+
+
+class LocalObjectStoreClient:
+    """Minimal boto3-style S3 client over a directory, standing in for MinIO in development."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _object_path(self, bucket: str, key: str) -> Path:
+        return self.root / bucket / key
+
+    def upload_fileobj(self, fileobj: BinaryIO, bucket: str, key: str) -> None:
+        path = self._object_path(bucket, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(fileobj, target)
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        path = self._object_path(Bucket, Key)
+        if not path.is_file():
+            raise FileNotFoundError(Key)
+        return {"Body": open(path, "rb"), "ContentLength": path.stat().st_size}
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        path = self._object_path(Bucket, Key)
+        if not path.is_file():
+            raise FileNotFoundError(Key)
+        return {"ContentLength": path.stat().st_size}
+
+    def delete_object(self, Bucket: str, Key: str) -> None:
+        self._object_path(Bucket, Key).unlink(missing_ok=True)
+
+    def list_objects_v2(self, Bucket: str, ContinuationToken: Optional[str] = None) -> dict:
+        bucket = self.root / Bucket
+        contents = []
+        if bucket.is_dir():
+            for path in bucket.rglob("*"):
+                if path.is_file():
+                    stat = path.stat()
+                    contents.append({
+                        "Key": path.relative_to(bucket).as_posix(),
+                        "Size": stat.st_size,
+                        "LastModified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                    })
+        return {"Contents": contents, "IsTruncated": False}
+
+
+class HashingReader:
+    """Wraps a stream and counts and SHA-256 hashes the bytes read through it."""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.count = 0
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.count += len(data)
+        self.sha256.update(data)
+        return data
+
+
+def is_missing_object(exc: Exception) -> bool:
+    if isinstance(exc, FileNotFoundError):
+        return True
+    # botocore ClientError
+    error = getattr(exc, "response", {}).get("Error", {})
+    return error.get("Code") in ("404", "NoSuchKey")
+
+
+class S3Storage(StorageBackend):
+    def __init__(self, bucket: str, client=None, endpoint_url: Optional[str] = None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("boto3 is required for s3:// storage; pip install boto3")
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.client = client
+
+    def save(self, key: str, fileobj: BinaryIO) -> int:
+        reader = HashingReader(fileobj)
+        self.client.upload_fileobj(reader, self.bucket, key)
+        return reader.count
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        except Exception as exc:
+            if is_missing_object(exc):
+                raise FileNotFoundError(key) from exc
+            raise
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except Exception as exc:
+            if is_missing_object(exc):
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def iter_keys(self) -> Iterator[StoredObject]:
+        params = {"Bucket": self.bucket}
+        while True:
+            page = self.client.list_objects_v2(**params)
+            for item in page.get("Contents", []):
+                yield StoredObject(item["Key"], item["Size"], item["LastModified"].timestamp())
+            if not page.get("IsTruncated"):
+                break
+            params["ContinuationToken"] = page["NextContinuationToken"]
+
+
+@dataclass
+class StoredBlob:
+    key: str
+    content_encoding: Optional[str]
+    size: int
+    stored_size: int
+    checksum: str  # SHA-256 of the stored bytes
+
+
+def checksum_of(chunks: Iterator[bytes]) -> str:
+    sha256 = hashlib.sha256()
+    for chunk in chunks:
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def looks_compressed(head: bytes) -> bool:
+    return head.startswith(COMPRESSED_SIGNATURES)
+
+
+def store_upload(backend: StorageBackend, key: str, fileobj: BinaryIO, compress: bool = True, level: int = 6) -> StoredBlob:
+    """Write an upload to `backend`, gzip-compressing it when that pays off.
+
+    The source must be seekable (an `UploadFile` spool is): compression goes to
+    a temporary spool first, and the raw bytes are stored instead when the
+    content is already compressed or shrinks by less than MIN_COMPRESSION_SAVING.
+    """
+    head = fileobj.read(8)
+    fileobj.seek(0)
+    if not compress or looks_compressed(head):
+        return save_raw(backend, key, fileobj)
+
+    size = 0
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        with gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=level, mtime=0) as compressor:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                compressor.write(chunk)
+                size += len(chunk)
+        stored_size = spool.tell()
+        if stored_size <= size * (1 - MIN_COMPRESSION_SAVING):
+            spool.seek(0)
+            reader = HashingReader(spool)
+            backend.save(key, reader)
+            return StoredBlob(key, GZIP, size, stored_size, reader.sha256.hexdigest())
+
+    fileobj.seek(0)
+    return save_raw(backend, key, fileobj)
+
+
+def save_raw(backend: StorageBackend, key: str, fileobj: BinaryIO) -> StoredBlob:
+    reader = HashingReader(fileobj)
+    backend.save(key, reader)
+    return StoredBlob(key, None, reader.count, reader.count, reader.sha256.hexdigest())
+
+
+def iter_decoded(chunks: Iterator[bytes], content_encoding: Optional[str]) -> Iterator[bytes]:
+    """Decode stored chunks back to the original bytes, one chunk at a time."""
+    if content_encoding != GZIP:
+        yield from chunks
+        return
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decoder.decompress(chunk)
+        if data:
+            yield data
+    tail = decoder.flush()
+    if tail:
+        yield tail
+
+
+def create_storage(url: str) -> StorageBackend:
+    scheme, _, location = url.partition("://")
+    if scheme == "local":
+        return LocalStorage(location)
+    if scheme == "archive":
+        return ArchiveStorage(location)
+    if scheme == "s3":
+        return S3Storage(location, endpoint_url=settings.s3_endpoint_url)
+    if scheme == "objectstore":
+        root, _, bucket = location.rstrip("/").rpartition("/")
+        return S3Storage(bucket, client=LocalObjectStoreClient(root))
+    raise ValueError(f"Unsupported storage URL: {url}")
+
+
+@lru_cache
+def get_tiers() -> Dict[str, StorageBackend]:
+    return {
+        HOT: LocalStorage(settings.upload_dir),
+        COLD: create_storage(settings.cold_storage_url),
+    }
+
+
+def get_storage(tier: str = HOT) -> StorageBackend:
+    return get_tiers()[tier]
+
+
+def locate(tier: str, key: str) -> StorageBackend:
+    """Return the backend holding `key`, trying the recorded tier first.
+
+    Falling back to the other tiers covers a read that races with a blob being
+    moved between tiers.
+    """
+    tiers = get_tiers()
+    for name in [tier] + [other for other in tiers if other != tier]:
+        if tiers[name].exists(key):
+            return tiers[name]
+    raise FileNotFoundError(key)
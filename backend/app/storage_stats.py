@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Report how much space contract files take and what compression saves.
+
+Usage (from the backend directory):
+    python -m app.storage_stats
+"""
+
+from sqlalchemy import func
+
+from app import models
+from app.database import SessionLocal
+
+
+def format_bytes(count: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if count < 1024 or unit == "GiB":
+            return f"{count:.1f} {unit}" if unit != "B" else f"{count} {unit}"
+        count /= 1024
+
+
+def storage_stats(db):
+    """Versions, original bytes and stored bytes grouped by tier and encoding."""
+    return db.query(
+        models.ContractVersion.storage_tier,
+        models.ContractVersion.content_encoding,
+        func.count(models.ContractVersion.id),
+        func.count(models.ContractVersion.size),
+        func.coalesce(func.sum(models.ContractVersion.size), 0),
+        func.coalesce(func.sum(models.ContractVersion.stored_size), 0),
+    ).group_by(
+        models.ContractVersion.storage_tier,
+        models.ContractVersion.content_encoding
+    ).order_by(
+        models.ContractVersion.storage_tier,
+        models.ContractVersion.content_encoding
+    ).all()
+
+
+def main():
+    db = SessionLocal()
+    try:
+        rows = storage_stats(db)
+    finally:
+        db.close()
+
+    print(f"{'tier':<6} {'encoding':<9} {'versions':>9} {'original':>12} {'stored':>12} {'saved':>7}")
+    total_size = total_stored = unmeasured = 0
+    for tier, encoding, versions, measured, size, stored_size in rows:
+        saved = f"{(1 - stored_size / size) * 100:.1f}%" if size else "-"
+        print(
+            f"{tier:<6} {encoding or 'raw':<9} {versions:>9} "
+            f"{format_bytes(size):>12} {format_bytes(stored_size):>12} {saved:>7}"
+        )
+        total_size += size
+        total_stored += stored_size
+        unmeasured += versions - measured
+
+    if total_size:
+        print(
+            f"\nTotal: {format_bytes(total_size)} uploaded, {format_bytes(total_stored)} stored, "
+            f"{format_bytes(total_size - total_stored)} saved ({(1 - total_stored / total_size) * 100:.1f}%)"
+        )
+    if unmeasured:
+        print(f"{unmeasured} version(s) uploaded before sizes were recorded are not included in the byte counts.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Move contract files from the hot tier to the cold tier.
+
+A version goes cold when its contract is SIGNED or DENIED, or when it has not
+been downloaded (or, if never downloaded, created) for `COLD_AFTER_DAYS`. The
+app runs this every `TIERING_INTERVAL_SECONDS`; it can also be run by hand:
+
+    python -m app.tiering [--batch-size 100]
+"""
+
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.storage import COLD, HOT, get_storage, storage_key
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = (models.ContractStatus.SIGNED, models.ContractStatus.DENIED)
+
+# Reads only refresh last_accessed_at when it is older than this, to keep
+# downloads from turning into a write every time
+ACCESS_TOUCH_INTERVAL = timedelta(hours=1)
+
+
+def touch_access(db: Session, version: models.ContractVersion) -> None:
+    now = datetime.utcnow()
+    if version.last_accessed_at is None or now - version.last_accessed_at.replace(tzinfo=None) > ACCESS_TOUCH_INTERVAL:
+        version.last_accessed_at = now
+        db.commit()
+
+
+def cold_candidates(db: Session, cutoff: datetime, after_id: int, limit: int):
+    return db.query(models.ContractVersion).join(models.Contract).filter(
+        models.ContractVersion.storage_tier == HOT,
+        models.ContractVersion.id > after_id,
+        or_(
+            models.Contract.status.in_(FINAL_STATUSES),
+            func.coalesce(models.ContractVersion.last_accessed_at, models.ContractVersion.created_at) < cutoff
+        )
+    ).order_by(models.ContractVersion.id).limit(limit).all()
+
+
+def move_to_cold(db: Session, version: models.ContractVersion) -> bool:
+    """Copy one blob to the cold tier, record it, then drop the hot copy."""
+    hot = get_storage(HOT)
+    cold = get_storage(COLD)
+    key = storage_key(version.file_path)
+    if not hot.exists(key):
+        logger.warning("Version %s: hot file %s is missing, leaving it in place", version.id, key)
+        return False
+
+    with hot.open(key) as source:
+        cold.save(key, source)
+    version.storage_tier = COLD
+    db.commit()
+    # Delete only after the commit: a crash in between leaves a stray hot copy, never a dangling row
+    hot.delete(key)
+    return True
+
+
+def run_tiering(batch_size: int = None, cold_after_days: int = None) -> int:
+    """Move every eligible version to the cold tier in id-ordered batches. Returns the count moved."""
+    batch_size = batch_size or settings.tiering_batch_size
+    cold_after_days = cold_after_days if cold_after_days is not None else settings.cold_after_days
+    cutoff = datetime.utcnow() - timedelta(days=cold_after_days)
+
+    moved = 0
+    after_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            batch = cold_candidates(db, cutoff, after_id, batch_size)
+            if not batch:
+                break
+            for version in batch:
+                after_id = version.id
+                if move_to_cold(db, version):
+                    moved += 1
+    finally:
+        db.close()
+    if moved:
+        logger.info("Moved %d contract file(s) to cold storage", moved)
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=settings.tiering_batch_size)
+    parser.add_argument("--cold-after-days", type=int, default=settings.cold_after_days)
+    args = parser.parse_args()
+    moved = run_tiering(args.batch_size, args.cold_after_days)
+    print(f"✓ Moved {moved} contract file(s) to cold storage.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Export an instance's data to a streaming archive, and import it elsewhere.
+
+The archive is a tar stream (gzip-compressed when the name ends in .gz):
+
+    manifest.json                       format version and table order
+    tables/<table>/<chunk>.ndjson       rows, one JSON object per line
+    blobs/<key>                         stored contract files, bytes as stored
+    summary.json                        row and blob counts, for verification
+
+Export reads each table in id-ordered batches and spools one blob at a time,
+so memory stays flat however large the instance is. Rows created after the
+export starts are left out; for a point-in-time copy, export while the
+instance is quiet.
+
+Import gives every row a fresh id (the exported id plus the target's current
+maximum, so a restore into an empty instance keeps ids unchanged), reuses
+existing users whose username and email both match, bulk-inserts each chunk on
+a worker pool and writes blobs to the hot tier in parallel. A user whose
+username or email alone matches an existing account stops the import, since
+merging would hand that account someone else's contracts. So does an archive
+whose contract files are already referenced here (it was imported before, or
+is being restored onto the instance it came from), since every contract would
+otherwise be duplicated onto the same files.
+
+Rows are inserted with explicit ids, so on PostgreSQL each table's id sequence
+is moved past the imported rows afterwards.
+
+If an import fails, the rows it inserted are deleted again (by the id ranges
+it handed out, so import into a quiet instance); blobs already written are
+left for the orphan collector (`python -m app.integrity --reclaim`).
+
+    python -m app.transfer export backup.tar.gz [--batch-size 1000]
+    python -m app.transfer import backup.tar.gz [--workers 4]
+
+Use "-" as the file name to write to stdout or read from stdin.
+"""
+
+import argparse
+import io
+import logging
+import sys
+import tarfile
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import BinaryIO, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import DateTime, Enum as SQLEnum, Table, delete, func, insert, or_, select
+
+from app import models
+from app.database import engine
+from app.integrity import LEGACY_PREFIX
+from app.storage import CHUNK_SIZE, HOT, get_storage, locate, storage_key
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Parents before children, so import can insert each table as it arrives.
+# user_contract_stats is derived and rebuilt on first read instead.
+TABLES: List[Table] = [
+    models.User.__table__,
+    models.Contract.__table__,
+    models.ContractVersion.__table__,
+    models.Notification.__table__,
+    models.ContractActivity.__table__,
+]
+TABLES_BY_NAME = {table.name: table for table in TABLES}
+
+# Blobs up to this size stay in memory while being copied; larger ones spill to disk
+SPOOL_SIZE = 8 * 1024 * 1024
+
+
+@dataclass
+class TransferReport:
+    rows: Dict[str, int] = field(default_factory=dict)
+    blobs: int = 0
+    blob_bytes: int = 0
+    missing_blobs: List[str] = field(default_factory=list)
+    merged_users: int = 0
+
+    def summary(self) -> str:
+        tables = ", ".join(f"{count} {name}" for name, count in self.rows.items())
+        return f"{tables}; {self.blobs} blobs ({self.blob_bytes} bytes)"
+
+
+def add_bytes(archive: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    archive.addfile(info, io.BytesIO(data))
+
+
+def iter_batches(table: Table, upper_id: int, batch_size: int) -> Iterator[list]:
+    """Rows of `table` up to `upper_id` in id order, one short-lived connection per batch."""
+    after_id = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(table).where(table.c.id > after_id, table.c.id <= upper_id)
+                .order_by(table.c.id).limit(batch_size)
+            ).mappings().all()
+        if not rows:
+            return
+        after_id = rows[-1]["id"]
+        yield rows
+
+
+def export_blob(archive: tarfile.TarFile, file_path: str, tier: str, report: TransferReport) -> None:
+    key = storage_key(file_path)
+    try:
+        backend = locate(tier, key)
+    except FileNotFoundError:
+        logger.warning("Blob %s is missing from every tier, leaving it out", key)
+        report.missing_blobs.append(key)
+        return
+    # Tar needs the size up front, which not every backend can tell us cheaply
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+        for chunk in backend.iter_chunks(key):
+            spool.write(chunk)
+        info = tarfile.TarInfo(f"blobs/{key}")
+        info.size = spool.tell()
+        info.mtime = int(time.time())
+        spool.seek(0)
+        archive.addfile(info, spool)
+    report.blobs += 1
+    report.blob_bytes += info.size
+
+
+def export_archive(fileobj: BinaryIO, compress: bool, batch_size: int = 1000) -> TransferReport:
+    report = TransferReport()
+    with engine.connect() as conn:
+        upper_ids = {table.name: conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar()
+                     for table in TABLES}
+
+    with tarfile.open(fileobj=fileobj, mode="w|gz" if compress else "w|") as archive:
+        add_bytes(archive, "manifest.json", orjson.dumps({
+            "format": FORMAT_VERSION,
+            "created_at": datetime.utcnow(),
+            "tables": [table.name for table in TABLES],
+        }))
+
+        for table in TABLES:
+            name = str(table.name)  # orjson only takes plain str keys
+            report.rows[name] = 0
+            for number, rows in enumerate(iter_batches(table, upper_ids[name], batch_size)):
+                data = b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+                add_bytes(archive, f"tables/{name}/{number:06d}.ndjson", data)
+                report.rows[name] += len(rows)
+
+        versions = models.ContractVersion.__table__
+        for rows in iter_batches(versions, upper_ids[versions.name], batch_size):
+            for row in rows:
+                export_blob(archive, row["file_path"], row["storage_tier"], report)
+
+        add_bytes(archive, "summary.json", orjson.dumps({
+            "rows": report.rows,
+            "blobs": report.blobs,
+            "blob_bytes": report.blob_bytes,
+        }))
+    return report
+
+
+def column_decoders(table: Table) -> Dict[str, Callable]:
+    """Turn JSON values back into what the column types expect."""
+    decoders = {}
+    for column in table.columns:
+        if isinstance(column.type, SQLEnum) and column.type.enum_class is not None:
+            decoders[column.name] = column.type.enum_class
+        elif isinstance(column.type, DateTime):
+            decoders[column.name] = datetime.fromisoformat
+    return decoders
+
+
+class Importer:
+    """Remaps ids and inserts rows as the archive streams past."""
+
+    def __init__(self, workers: int):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import")
+        # At most this many chunks or blobs are held while waiting for a worker
+        self.max_pending = workers * 2
+        self.pending: Deque[Future] = deque()
+        self.report = TransferReport()
+        self.user_ids: Dict[int, int] = {}
+        # What this import inserted, so a failed run can be undone
+        self.new_user_ids: List[int] = []
+        self.id_ranges: Dict[str, Tuple[int, int]] = {}
+        self.decoders = {table.name: column_decoders(table) for table in TABLES}
+        self.hot = get_storage(HOT)
+        with engine.connect() as conn:
+            self.offsets = {table.name: conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar()
+                            for table in TABLES}
+
+    def submit(self, func: Callable, *args) -> None:
+        while len(self.pending) >= self.max_pending:
+            self.pending.popleft().result()
+        self.pending.append(self.pool.submit(func, *args))
+
+    def drain(self) -> None:
+        while self.pending:
+            self.pending.popleft().result()
+
+    def decode(self, table: Table, line: bytes) -> dict:
+        row = orjson.loads(line)
+        for name, decoder in self.decoders[table.name].items():
+            if row.get(name) is not None:
+                row[name] = decoder(row[name])
+        return row
+
+    def user(self, exported_id: Optional[int]) -> Optional[int]:
+        return None if exported_id is None else self.user_ids[exported_id]
+
+    def offset(self, table: Table, exported_id: int) -> int:
+        return exported_id + self.offsets[table.name]
+
+    def remap(self, table: Table, row: dict) -> dict:
+        row["id"] = self.offset(table, row["id"])
+        low, high = self.id_ranges.get(table.name, (row["id"], row["id"]))
+        self.id_ranges[table.name] = (min(low, row["id"]), max(high, row["id"]))
+        if table.name == "contracts":
+            row["sender_id"] = self.user(row["sender_id"])
+            row["recipient_id"] = self.user(row["recipient_id"])
+            row["locked_by_id"] = self.user(row["locked_by_id"])
+            return row
+        contracts = models.Contract.__table__
+        row["contract_id"] = self.offset(contracts, row["contract_id"])
+        if table.name == "contract_versions":
+            row["created_by_id"] = self.user(row["created_by_id"])
+            # Every blob is written to the hot tier; tiering moves it on later
+            row["storage_tier"] = HOT
+        elif table.name == "notifications":
+            row["user_id"] = self.user(row["user_id"])
+        elif table.name == "contract_activity":
+            row["user_id"] = self.user(row["user_id"])
+            row["actor_id"] = self.user(row["actor_id"])
+        return row
+
+    def import_users(self, rows: List[dict]) -> None:
+        # Runs inline: every later table needs the finished user id map
+        users = models.User.__table__
+        with engine.begin() as conn:
+            existing = conn.execute(select(users.c.id, users.c.username, users.c.email).where(or_(
+                users.c.username.in_([row["username"] for row in rows]),
+                users.c.email.in_([row["email"] for row in rows]),
+            ))).all()
+            by_username = {username: (user_id, email) for user_id, username, email in existing}
+            by_email = {email: username for _, username, email in existing}
+            new_rows = []
+            for row in rows:
+                if row["username"] in by_username:
+                    user_id, email = by_username[row["username"]]
+                    if email != row["email"]:
+                        raise ValueError(
+                            f"User {row['username']!r} already exists here with a different email; "
+                            f"refusing to merge the archive's account into it"
+                        )
+                    self.user_ids[row["id"]] = user_id
+                    self.report.merged_users += 1
+                    continue
+                if row["email"] in by_email:
+                    raise ValueError(
+                        f"User {row['username']!r} has the email of existing user {by_email[row['email']]!r}"
+                    )
+                self.user_ids[row["id"]] = row["id"] = self.offset(users, row["id"])
+                self.new_user_ids.append(row["id"])
+                new_rows.append(row)
+            if new_rows:
+                conn.execute(insert(users), new_rows)
+
+    @staticmethod
+    def refuse_reimport(rows: List[dict]) -> None:
+        """Stop if any of these versions' blobs is already referenced by a version here."""
+        keys = [storage_key(row["file_path"]) for row in rows]
+        versions = models.ContractVersion.__table__
+        with engine.connect() as conn:
+            taken = conn.execute(select(versions.c.file_path).where(
+                versions.c.file_path.in_(keys + [LEGACY_PREFIX + key for key in keys])
+            ).limit(1)).scalar()
+        if taken is not None:
+            raise ValueError(
+                f"File {storage_key(taken)!r} is already referenced here: this archive (or the "
+                f"instance it was exported from) has been imported before"
+            )
+
+    @staticmethod
+    def insert_rows(table: Table, rows: List[dict]) -> None:
+        with engine.begin() as conn:
+            conn.execute(insert(table), rows)
+
+    def import_chunk(self, table: Table, data: bytes) -> None:
+        rows = [self.decode(table, line) for line in data.splitlines() if line]
+        if not rows:
+            return
+        self.report.rows[table.name] = self.report.rows.get(table.name, 0) + len(rows)
+        if table.name == "users":
+            self.import_users(rows)
+        else:
+            if table.name == "contract_versions":
+                self.refuse_reimport(rows)
+            self.submit(self.insert_rows, table, [self.remap(table, row) for row in rows])
+
+    def save_blob(self, key: str, spool: BinaryIO) -> None:
+        with spool:
+            self.hot.save(key, spool)
+
+    def import_blob(self, key: str, stream: BinaryIO, size: int) -> None:
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            spool.write(chunk)
+        spool.seek(0)
+        self.submit(self.save_blob, key, spool)
+        self.report.blobs += 1
+        self.report.blob_bytes += size
+
+    def undo(self) -> None:
+        """Delete every row this import inserted."""
+        # Let in-flight inserts land (or fail) first, so none slips in after the cleanup
+        while self.pending:
+            try:
+                self.pending.popleft().result()
+            except Exception:
+                pass
+        with engine.begin() as conn:
+            for table in reversed(TABLES[1:]):
+                if table.name in self.id_ranges:
+                    low, high = self.id_ranges[table.name]
+                    conn.execute(delete(table).where(table.c.id.between(low, high)))
+            if self.new_user_ids:
+                stats = models.UserContractStats.__table__
+                users = models.User.__table__
+                conn.execute(delete(stats).where(stats.c.user_id.in_(self.new_user_ids)))
+                conn.execute(delete(users).where(users.c.id.in_(self.new_user_ids)))
+        logger.warning(
+            "Import failed; removed its rows (%s new users, ranges %s). Written blobs are left "
+            "for the orphan collector", len(self.new_user_ids), self.id_ranges
+        )
+
+    def sync_sequences(self) -> None:
+        """Move PostgreSQL id sequences past the rows inserted with explicit ids."""
+        if engine.url.get_backend_name() != "postgresql":
+            return
+        with engine.begin() as conn:
+            for table in TABLES:
+                conn.execute(select(func.setval(
+                    func.pg_get_serial_sequence(table.name, "id"),
+                    select(func.coalesce(func.max(table.c.id), 0) + 1).scalar_subquery(),
+                    False,
+                )))
+
+    def finish(self) -> None:
+        self.drain()
+        self.pool.shutdown()
+        # Dashboard counts of merged users are stale now; they rebuild on next read
+        if self.user_ids:
+            stats = models.UserContractStats.__table__
+            with engine.begin() as conn:
+                conn.execute(delete(stats).where(stats.c.user_id.in_(list(self.user_ids.values()))))
+
+
+def import_archive(fileobj: BinaryIO, workers: int = 4) -> TransferReport:
+    importer = Importer(workers)
+    expected = None
+    current_table = None
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                stream = archive.extractfile(member)
+                if member.name == "manifest.json":
+                    manifest = orjson.loads(stream.read())
+                    if manifest.get("format") != FORMAT_VERSION:
+                        raise ValueError(f"Unsupported archive format {manifest.get('format')!r}")
+                elif member.name == "summary.json":
+                    expected = orjson.loads(stream.read())
+                elif member.name.startswith("tables/"):
+                    table = TABLES_BY_NAME[member.name.split("/")[1]]
+                    if table is not current_table:
+                        # Children reference the parent rows, so the previous table must be in first
+                        importer.drain()
+                        current_table = table
+                    importer.import_chunk(table, stream.read())
+                elif member.name.startswith("blobs/"):
+                    if current_table is not None:
+                        importer.drain()
+                        current_table = None
+                    importer.import_blob(storage_key(member.name), stream, member.size)
+        importer.drain()
+
+        report = importer.report
+        if expected is None:
+            raise ValueError(f"Archive has no summary.json (truncated?); read {report.summary()}")
+        if expected["rows"] != {name: report.rows.get(name, 0) for name in expected["rows"]} \
+                or expected["blobs"] != report.blobs:
+            raise ValueError(f"Archive is incomplete: expected {expected}, read {report.summary()}")
+        importer.sync_sequences()
+    except BaseException:
+        importer.undo()
+        raise
+    finally:
+        importer.finish()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write users, contracts, versions, notifications and files")
+    export_parser.add_argument("path", help='archive to write (".gz" compresses it, "-" is stdout)')
+    export_parser.add_argument("--batch-size", type=int, default=1000, help="rows per chunk")
+    import_parser = commands.add_parser("import", help="load an archive into this instance")
+    import_parser.add_argument("path", help='archive to read ("-" is stdin)')
+    import_parser.add_argument("--workers", type=int, default=4, help="parallel inserts and file writes")
+    args = parser.parse_args()
+    # Progress goes to stderr so "export -" can be piped
+    out = sys.stderr
+
+    if args.command == "export":
+        compress = args.path.endswith(".gz")
+        if args.path == "-":
+            report = export_archive(sys.stdout.buffer, compress=False, batch_size=args.batch_size)
+        else:
+            with open(args.path, "wb") as fileobj:
+                report = export_archive(fileobj, compress=compress, batch_size=args.batch_size)
+        print(f"✓ Exported {report.summary()}.", file=out)
+        if report.missing_blobs:
+            print(f"✗ {len(report.missing_blobs)} file(s) were missing and left out "
+                  f"(see python -m app.integrity).", file=out)
+    else:
+        if args.path == "-":
+            report = import_archive(sys.stdin.buffer, workers=args.workers)
+        else:
+            with open(args.path, "rb") as fileobj:
+                report = import_archive(fileobj, workers=args.workers)
+        print(f"✓ Imported {report.summary()}.", file=out)
+        if report.merged_users:
+            print(f"  {report.merged_users} user(s) already existed and were reused.", file=out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ORM + Pydantic and fast (projected rows + orjson) serialization
+paths for `get_my_contracts` and `get_contract_versions`.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_serialization [--sizes 1000 10000] [--versions 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import joinedload, sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import models, schemas  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.serialization import contract_list_rows, version_list_rows  # noqa: E402
+from fastapi.responses import ORJSONResponse  # noqa: E402
+
+contract_list_adapter = TypeAdapter(List[schemas.ContractResponse])
+version_list_adapter = TypeAdapter(List[schemas.ContractVersionResponse])
+
+
+def seed(session, contracts: int, versions_per_contract: int) -> int:
+    """Create one user owning `contracts` contracts, each with a few versions."""
+    owner = models.User(username="owner", email="owner@example.com", hashed_password="x", full_name="Owner")
+    peers = [
+        models.User(username=f"peer{i}", email=f"peer{i}@example.com", hashed_password="x")
+        for i in range(50)
+    ]
+    session.add(owner)
+    session.add_all(peers)
+    session.flush()
+
+    session.execute(insert(models.Contract), [
+        {
+            "id": i + 1,
+            "title": f"Contract {i}",
+            "file_path": f"uploads/{i}.pdf",
+            "file_name": f"{i}.pdf",
+            "sender_id": owner.id if i % 2 else peers[i % 50].id,
+            "recipient_id": peers[i % 50].id if i % 2 else owner.id,
+            "status": models.ContractStatus.PENDING,
+            "notes": "Benchmark contract",
+        }
+        for i in range(contracts)
+    ])
+    session.execute(insert(models.ContractVersion), [
+        {
+            "contract_id": i + 1,
+            "version_number": v + 1,
+            "file_path": f"uploads/{i}-{v}.pdf",
+            "file_name": f"{i}.pdf",
+            "created_by_id": owner.id,
+            "change_notes": f"Version {v + 1}",
+        }
+        for i in range(contracts)
+        for v in range(versions_per_contract)
+    ])
+    session.commit()
+    return owner.id
+
+
+def orm_contract_list(session, user_id: int) -> bytes:
+    contracts = session.query(models.Contract).options(
+        joinedload(models.Contract.sender),
+        joinedload(models.Contract.recipient),
+        joinedload(models.Contract.versions).joinedload(models.ContractVersion.created_by)
+    ).filter(
+        (models.Contract.sender_id == user_id) | (models.Contract.recipient_id == user_id)
+    ).all()
+    return contract_list_adapter.dump_json(contracts)
+
+
+def orm_version_list(session, contract_id: int) -> bytes:
+    versions = session.query(models.ContractVersion).options(
+        joinedload(models.ContractVersion.created_by)
+    ).filter(
+        models.ContractVersion.contract_id == contract_id
+    ).order_by(models.ContractVersion.version_number.desc()).all()
+    return version_list_adapter.dump_json(versions)
+
+
+def timed(Session, fn, *args, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        session = Session()
+        try:
+            start = time.perf_counter()
+            fn(session, *args)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            session.close()
+    return best
+
+
+def run(contracts: int, versions_per_contract: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        session = Session()
+        user_id = seed(session, contracts, versions_per_contract)
+        session.close()
+
+        cases = [
+            ("contract list", orm_contract_list,
+             lambda s, uid: ORJSONResponse(content=contract_list_rows(s, uid)).body, user_id),
+            ("version list", orm_version_list,
+             lambda s, cid: ORJSONResponse(content=version_list_rows(s, cid)).body, 1),
+        ]
+        for name, slow, fast, arg in cases:
+            orm_time = timed(Session, slow, arg, repeat=repeat)
+            fast_time = timed(Session, fast, arg, repeat=repeat)
+            print(
+                f"{contracts:>6} contracts  {name:<14} "
+                f"orm+pydantic {orm_time * 1000:9.1f} ms   "
+                f"fast {fast_time * 1000:9.1f} ms   "
+                f"speedup {orm_time / fast_time:5.1f}x"
+            )
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--versions", type=int, default=3, help="versions per contract")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.versions, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
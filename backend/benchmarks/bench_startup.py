@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start cost: `import app.main` time and time-to-first-request of
+a freshly spawned uvicorn worker, each in a clean subprocess and temp directory.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def environment(workdir: str) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR
+    env["DATABASE_URL"] = f"sqlite:///{workdir}/contracts.db"
+    env["UPLOAD_DIR"] = f"{workdir}/uploads"
+    return env
+
+
+def import_time() -> float:
+    with tempfile.TemporaryDirectory() as workdir:
+        output = subprocess.check_output(
+            [sys.executable, "-c", IMPORT_SNIPPET], cwd=workdir, env=environment(workdir)
+        )
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def time_to_first_request(timeout: float = 30.0) -> float:
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env=environment(workdir),
+        )
+        try:
+            while time.perf_counter() - start < timeout:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                        if response.status == 200:
+                            return time.perf_counter() - start
+                except OSError:
+                    time.sleep(0.01)
+            raise RuntimeError("server did not answer within the timeout")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, measure in (("import app.main", import_time), ("time to first request", time_to_first_request)):
+        samples = [measure() for _ in range(args.runs)]
+        print(
+            f"{name:<22} median {statistics.median(samples) * 1000:7.1f} ms   "
+            f"min {min(samples) * 1000:7.1f} ms   max {max(samples) * 1000:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
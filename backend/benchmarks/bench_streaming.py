@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measure time-to-first-byte and peak Python memory for the buffered JSON and
+streamed NDJSON renderings of `get_my_contracts`.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_streaming [--sizes 1000 10000 50000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import serialization  # noqa: E402
+from app.database import Base  # noqa: E402
+from benchmarks.bench_serialization import seed  # noqa: E402
+from fastapi.responses import ORJSONResponse  # noqa: E402
+
+
+def measure(produce):
+    """Return (time to first chunk, total time, peak traced bytes) for a chunk iterator."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    for _ in produce():
+        if first is None:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first, total, peak
+
+
+def run(contracts: int, versions_per_contract: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        session = Session()
+        user_id = seed(session, contracts, versions_per_contract)
+        session.close()
+
+        def buffered():
+            session = Session()
+            try:
+                yield ORJSONResponse(content=serialization.contract_list_rows(session, user_id)).body
+            finally:
+                session.close()
+
+        streamed = lambda: serialization.stream_ndjson(  # noqa: E731
+            lambda db: serialization.iter_contract_rows(db, user_id), Session
+        )
+
+        for name, produce in (("json", buffered), ("ndjson", streamed)):
+            first, total, peak = measure(produce)
+            print(
+                f"{contracts:>6} contracts  {name:<6} "
+                f"ttfb {first * 1000:8.1f} ms   total {total * 1000:8.1f} ms   "
+                f"peak {peak / 1024 / 1024:7.1f} MiB"
+            )
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--versions", type=int, default=3, help="versions per contract")
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.versions)
+
+
+if __name__ == "__main__":
+    main()
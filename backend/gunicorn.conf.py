@@ -0,0 +1,40 @@
+"""
+Gunicorn config for multi-worker deployments.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Workers are uvicorn ASGI workers. With more than one worker the shared-state
+backend defaults to a SQLite file next to the database, so the contract
+response cache, locks and pub/sub stay consistent across processes.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+if workers > 1:
+    os.environ.setdefault("SHARED_STATE_URL", "sqlite:///./shared_state.db")
+
+# The master migrates once; workers only verify the schema on startup
+os.environ.setdefault("SCHEMA_MODE", "check")
+
+
+def on_starting(server):
+    if workers > 1 and os.environ["SHARED_STATE_URL"].startswith("memory://"):
+        raise RuntimeError("SHARED_STATE_URL=memory:// is per process; use a sqlite:/// backend with multiple workers")
+
+    # Migrate once in the master instead of racing in every worker
+    from app.database import engine
+    from app.migrate import migrate
+    migrate(engine)
+    engine.dispose()
+
+    # The shared state file outlives restarts; drop responses cached from an earlier database
+    from app.cache import contract_cache
+    contract_cache.clear()